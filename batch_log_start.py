@@ -47,6 +47,27 @@ def get_batch_details(connection):
         print(f"Error executing query: {e}")
         return None, None
 
+def create_hop_metrics_table(conn):
+    """Create etl_metadata.hop_metrics, where every hop records rows, bytes and duration per table per batch."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS etl_metadata.hop_metrics (
+                    etl_batch_no INTEGER,
+                    etl_batch_date DATE,
+                    table_name VARCHAR(128) NOT NULL,
+                    hop VARCHAR(32) NOT NULL,
+                    row_count BIGINT,
+                    byte_count BIGINT,
+                    duration_seconds DOUBLE PRECISION,
+                    rows_per_sec DOUBLE PRECISION,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        conn.commit()
+    except Exception as e:
+        print("Error creating hop metrics table:", e)
+
 # Insert batch log into Redshift
 def start_batch_log(conn, batch_no, batch_date):
     try:
@@ -87,6 +108,7 @@ def main():
     print("Logging batch start into etl_metadata.batch_control_log")
     redshift_conn = connect_to_redshift(redshift_credentials)
     batch_no, batch_date = get_batch_details(redshift_conn)
+    create_hop_metrics_table(redshift_conn)
     start_batch_log(redshift_conn, batch_no, batch_date)
 
 
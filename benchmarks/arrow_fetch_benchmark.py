@@ -0,0 +1,69 @@
+"""Tuple fetch + csv.writer versus Arrow data frame fetch + pyarrow CSV writer.
+
+Reads CUSTOMERS, ORDERS and ORDERDETAILS through the engine's session pool (same .env
+as extract_engine.py) and encodes each as CSV into a byte-counting sink, so only the
+fetch and encode work is timed, not S3.
+
+Run from the repository root:  python -m benchmarks.arrow_fetch_benchmark
+"""
+import argparse
+import io
+import time
+
+import extract_engine
+from extract_engine import (
+    acquire_session, fetch_arrow_batches, fetch_batches, source_object, table_source_mode, tables, write_arrow_csv, write_csv
+)
+
+class CountingSink(io.RawIOBase):
+    """Writable stream that discards data and only counts bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+def time_tuple_path(sql_query, columns, source_mode):
+    sink = CountingSink()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            cursor.arraysize = extract_engine.fetch_arraysize
+            cursor.prefetchrows = extract_engine.fetch_prefetchrows
+            cursor.execute(sql_query)
+            row_count = write_csv(columns, fetch_batches(cursor, cursor.fetchmany()), sink)
+    return row_count, sink.bytes_written, time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+def time_arrow_path(sql_query, source_mode):
+    sink = CountingSink()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    with acquire_session(source_mode) as connection:
+        row_count = write_arrow_csv(fetch_arrow_batches(connection, sql_query, {}, extract_engine.fetch_arraysize), sink)
+    return row_count, sink.bytes_written, time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', nargs='+', default=['CUSTOMERS', 'ORDERS', 'ORDERDETAILS'], choices=list(tables))
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the fastest is reported")
+    args = parser.parse_args()
+
+    print(f"{'table':<14} {'path':<6} {'rows':>10} {'bytes':>13} {'wall s':>8} {'cpu s':>8} {'rows/sec':>11}")
+    for table_name in args.tables:
+        columns = tables[table_name]['columns']
+        source_mode = table_source_mode(table_name)
+        sql_query = f"SELECT {', '.join(columns)} FROM {source_object(table_name, source_mode)}"
+        for path, run in (('tuple', lambda: time_tuple_path(sql_query, columns, source_mode)),
+                          ('arrow', lambda: time_arrow_path(sql_query, source_mode))):
+            row_count, size, wall, cpu = min((run() for _ in range(args.repeat)), key=lambda result: result[2])
+            rows_per_sec = row_count / wall if wall > 0 else float(row_count)
+            print(f"{table_name:<14} {path:<6} {row_count:>10,} {size:>13,} {wall:>8.2f} {cpu:>8.2f} {rows_per_sec:>11,.0f}")
+    extract_engine.report_pool_stats()
+
+if __name__ == "__main__":
+    main()
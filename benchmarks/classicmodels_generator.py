@@ -0,0 +1,447 @@
+"""Deterministic classicmodels data at 1x to 10,000x the sample's size, plus daily deltas.
+
+The eight source tables keep the sample's shape: every order belongs to an existing
+customer, every line to an existing order and product, customers to sales reps and
+employees to offices and managers. Activity is skewed the way real order books are: a
+small share of customers places most orders, a few products sell most lines, country and
+product line mixes follow the sample, and order volume grows towards the snapshot date.
+Orders are updated when they ship or are cancelled, a share of customers, products and
+employees some days after creation, and everything else keeps UPDATE_TIMESTAMP equal to
+CREATE_TIMESTAMP.
+
+The snapshot holds everything that happened before --as-of. Delta day N is the activity
+on date as_of + N - 1: new customers, products, orders with their lines and payments, and
+updated versions of existing rows (orders shipped or cancelled, credit limits and stock
+levels changed), all with UPDATE_TIMESTAMP inside that day. Extracting a delta day with
+etl_batch_date set to that date picks up exactly that day's rows. The same seed, scale and
+dates always produce the same rows, whether or not the snapshot is generated in the same run.
+
+Rows go to a sqlite database (the local pipeline benchmark's source), CSV files, or the
+Oracle source schema for load tests, logged in as create_change_log.py and direct-mode
+extracts do (DBLINK_USERNAME/DBLINK_PASSWORD on SOURCE_DSN, which defaults to ORACLE_DSN).
+sqlite and Oracle upsert by each table's primary_key, so deltas apply on top of the snapshot.
+
+Run from the repository root:
+    python -m benchmarks.classicmodels_generator --scale 100 --sqlite source.db --delta-days 7
+"""
+import argparse
+import csv
+import datetime
+import math
+import os
+import random
+import sqlite3
+import time
+
+from source_config import source_dsn, source_password, source_username, tables
+
+MAX_SCALE = 10000
+
+# Row counts in the classicmodels sample; orderdetails follow from ~9 lines per order
+BASE_COUNTS = {'CUSTOMERS': 122, 'PRODUCTS': 110, 'ORDERS': 326, 'PAYMENTS': 273}
+BASE_OFFICES = 7
+BASE_EMPLOYEES = 23
+
+# Mixes taken from the sample data
+PRODUCT_LINES = {'Classic Cars': 38, 'Vintage Cars': 24, 'Motorcycles': 13, 'Planes': 12, 'Trucks and Buses': 11,
+                 'Ships': 9, 'Trains': 3}
+PRODUCT_SCALES = {'1:18': 42, '1:24': 27, '1:700': 10, '1:12': 9, '1:32': 8, '1:10': 6, '1:50': 5, '1:72': 3}
+COUNTRIES = {'USA': 36, 'Germany': 13, 'France': 12, 'Spain': 7, 'Australia': 5, 'UK': 5, 'Italy': 4, 'New Zealand': 4,
+             'Canada': 3, 'Finland': 3, 'Switzerland': 3, 'Singapore': 3, 'Japan': 2, 'Norway': 3, 'Denmark': 2,
+             'Belgium': 2, 'Sweden': 2, 'Austria': 2, 'Philippines': 1, 'Ireland': 2}
+CLOSED_STATUSES = {'Shipped': 303, 'Cancelled': 6, 'Resolved': 4, 'Disputed': 3}
+OPEN_STATUSES = {'In Process': 6, 'On Hold': 4}
+# Orders placed this many days before a snapshot may still be open
+OPEN_ORDER_DAYS = 10
+# Customers start trading up to a year before the first order
+CUSTOMER_LEAD_DAYS = 365
+
+# Skew exponents: index = n * u ** k puts most picks on the first few customers and products
+CUSTOMER_SKEW = 2.5
+PRODUCT_SKEW = 1.6
+
+# Daily activity per 1x of scale, and the share of existing rows touched per day
+DAILY_NEW = {'CUSTOMERS': 0.05, 'PRODUCTS': 0.01, 'ORDERS': 0.75, 'PAYMENTS': 0.6}
+DAILY_UPDATED = {'CUSTOMERS': 0.002, 'PRODUCTS': 0.01, 'EMPLOYEES': 0.002}
+
+
+def weighted(rng, mix):
+    return rng.choices(list(mix), list(mix.values()))[0]
+
+def skewed_index(rng, count, exponent):
+    return min(int(count * rng.random() ** exponent), count - 1)
+
+def at_time(day, rng, first_hour=8, last_hour=20):
+    """A timestamp on `day` during business hours, to the second."""
+    return datetime.datetime.combine(day, datetime.time(rng.randint(first_hour, last_hour - 1), rng.randint(0, 59), rng.randint(0, 59)))
+
+
+class ClassicModelsGenerator:
+    """Builds source rows as tuples in the column order of extract_engine.tables.
+
+    Every snapshot entity is derived from (seed, table, index) alone, so any row can be rebuilt
+    without generating the rows before it; this is what lets a delta update a snapshot row
+    without holding the snapshot in memory.
+    """
+
+    def __init__(self, scale, seed=42, start_date=datetime.date(2003, 1, 6), as_of=datetime.date(2005, 6, 9)):
+        if not 1 <= scale <= MAX_SCALE:
+            raise ValueError(f"scale must be between 1 and {MAX_SCALE}, got {scale}")
+        if as_of <= start_date:
+            raise ValueError(f"as_of ({as_of}) must be after start_date ({start_date})")
+        self.scale = scale
+        self.seed = seed
+        self.start_date = start_date
+        self.as_of = as_of
+        self.span_days = (as_of - start_date).days
+        # Sales organisation grows with the square root of the business
+        org_scale = math.ceil(math.sqrt(scale))
+        self.counts = {table_name: count * scale for table_name, count in BASE_COUNTS.items()}
+        self.counts['OFFICES'] = BASE_OFFICES * org_scale
+        self.counts['EMPLOYEES'] = BASE_EMPLOYEES * org_scale
+        self.counts['PRODUCTLINES'] = len(PRODUCT_LINES)
+        self._msrp = None
+        self._columns = {table_name: [column.upper() for column in table['columns']] for table_name, table in tables.items()}
+
+    @property
+    def history_start(self):
+        """A date before every snapshot timestamp; a batch dated here extracts the whole snapshot."""
+        return self.start_date - datetime.timedelta(days=CUSTOMER_LEAD_DAYS + 1)
+
+    def _rng(self, *key):
+        return random.Random(':'.join(str(part) for part in (self.seed, *key)))
+
+    def _row(self, table_name, values):
+        return tuple(map(values.get, self._columns[table_name]))
+
+    def _date_of(self, index, count, rng):
+        """Spread `count` entities over the snapshot span in index order, denser towards the end."""
+        offset = self.span_days * math.sqrt((index + rng.random()) / count)
+        return self.start_date + datetime.timedelta(days=min(int(offset), self.span_days - 1))
+
+    def _stamps(self, created, rng, update_share, mean_lag_days, latest):
+        """CREATE/UPDATE_TIMESTAMP pair; `update_share` of rows were changed a few days after creation."""
+        updated = created
+        if rng.random() < update_share:
+            lag = datetime.timedelta(days=rng.expovariate(1 / mean_lag_days), seconds=rng.randint(0, 3600))
+            updated = (created + lag).replace(microsecond=0)
+            updated = min(updated, latest)
+        return {'CREATE_TIMESTAMP': created, 'UPDATE_TIMESTAMP': max(updated, created)}
+
+    def _snapshot_end(self):
+        return datetime.datetime.combine(self.as_of, datetime.time()) - datetime.timedelta(seconds=1)
+
+    # Snapshot entities, each rebuilt from its index
+
+    def office(self, index):
+        rng = self._rng('OFFICES', index)
+        country = weighted(rng, COUNTRIES)
+        created = at_time(self.history_start + datetime.timedelta(days=1), rng)
+        return dict(OFFICECODE=str(index + 1), CITY=f"{country} City {index + 1}", PHONE=f"+1 650 219 {index:04d}",
+                    ADDRESSLINE1=f"{100 + index} Market Street", ADDRESSLINE2=f"Suite {index}" if rng.random() < 0.4 else None,
+                    STATE=None, COUNTRY=country, POSTALCODE=f"{10000 + index * 7}", TERRITORY='NA' if country in ('USA', 'Canada') else 'EMEA',
+                    **self._stamps(created, rng, 0.1, 200, self._snapshot_end()))
+
+    def employee(self, index):
+        """Employees form a tree with four reports per manager; everyone below the third level sells."""
+        rng = self._rng('EMPLOYEES', index)
+        depth = 0 if index == 0 else int(math.log(3 * index + 1, 4))
+        title = ['President', 'VP Sales', 'Sales Manager'][depth] if depth < 3 else 'Sales Rep'
+        created = at_time(self.history_start + datetime.timedelta(days=1 + index % 30), rng)
+        return dict(EMPLOYEENUMBER=1002 + index, LASTNAME=f"Last{index}", FIRSTNAME=f"First{index}", EXTENSION=f"x{1000 + rng.randint(0, 8999)}",
+                    EMAIL=f"employee{index}@classicmodelcars.com", OFFICECODE=str(index % self.counts['OFFICES'] + 1),
+                    REPORTSTO=1002 + (index - 1) // 4 if index else None, JOBTITLE=title,
+                    **self._stamps(created, rng, 0.2, 120, self._snapshot_end()))
+
+    def sales_rep(self, rng):
+        employees = self.counts['EMPLOYEES']
+        first_rep = min((4 ** 3 - 1) // 3, employees - 1)
+        return 1002 + rng.randint(first_rep, employees - 1)
+
+    def customer(self, index, created=None):
+        rng = self._rng('CUSTOMERS', index)
+        if created is None:
+            created = at_time(self._date_of(index, self.counts['CUSTOMERS'], rng) - datetime.timedelta(days=CUSTOMER_LEAD_DAYS), rng)
+        country = weighted(rng, COUNTRIES)
+        has_rep = rng.random() < 0.82
+        return dict(CUSTOMERNUMBER=103 + index, CUSTOMERNAME=f"{country} Collectables {index}", CONTACTLASTNAME=f"Contact{index}",
+                    CONTACTFIRSTNAME=rng.choice(['Jean', 'Peter', 'Julie', 'Susan', 'Carine', 'Roland', 'Diego', 'Mary']),
+                    PHONE=f"{rng.randint(10, 99)}.{rng.randint(1000000, 9999999)}", ADDRESSLINE1=f"{rng.randint(1, 999)} {country} Road",
+                    ADDRESSLINE2=None, CITY=f"{country} City {index % 97}", STATE=None, POSTALCODE=f"{rng.randint(10000, 99999)}",
+                    COUNTRY=country, SALESREPEMPLOYEENUMBER=self.sales_rep(rng) if has_rep else None,
+                    CREDITLIMIT=rng.randrange(20000, 230000, 100) if has_rep else 0,
+                    **self._stamps(created, rng, 0.3, 30, max(created, self._snapshot_end())))
+
+    def product_code(self, index):
+        return f"S{list(PRODUCT_SCALES)[index % len(PRODUCT_SCALES)].split(':')[1]}_{1000 + index}"
+
+    def product(self, index, created=None):
+        rng = self._rng('PRODUCTS', index)
+        if created is None:
+            created = at_time(self.history_start + datetime.timedelta(days=rng.randint(0, CUSTOMER_LEAD_DAYS)), rng)
+        buy_price = round(rng.uniform(15, 105), 2)
+        return dict(PRODUCTCODE=self.product_code(index), PRODUCTNAME=f"Model {index}", PRODUCTLINE=weighted(rng, PRODUCT_LINES),
+                    PRODUCTSCALE=list(PRODUCT_SCALES)[index % len(PRODUCT_SCALES)], PRODUCTVENDOR=f"Vendor {rng.randint(1, 13)}",
+                    QUANTITYINSTOCK=rng.randint(0, 9999), BUYPRICE=buy_price, MSRP=round(buy_price * rng.uniform(1.3, 2.2), 2),
+                    **self._stamps(created, rng, 0.15, 60, max(created, self._snapshot_end())))
+
+    def msrp(self, index):
+        """MSRP of a product; snapshot products are cached, since every order line needs one."""
+        if self._msrp is None:
+            self._msrp = [self.product(i)['MSRP'] for i in range(self.counts['PRODUCTS'])]
+        if index < len(self._msrp):
+            return self._msrp[index]
+        return self.product(index)['MSRP']
+
+    def productline(self, name):
+        rng = self._rng('PRODUCTLINES', name)
+        created = at_time(self.history_start, rng)
+        return dict(PRODUCTLINE=name, **self._stamps(created, rng, 0.0, 1, created))
+
+    def order(self, index, ordered=None):
+        """Order header; snapshot orders are numbered in date order, as in the sample."""
+        rng = self._rng('ORDERS', index)
+        if ordered is None:
+            ordered = self._date_of(index, self.counts['ORDERS'], rng)
+        created = at_time(ordered, rng)
+        open_order = (self.as_of - ordered).days <= OPEN_ORDER_DAYS
+        status = weighted(rng, OPEN_STATUSES if open_order and rng.random() < 0.7 else CLOSED_STATUSES)
+        order = dict(ORDERNUMBER=10100 + index, ORDERDATE=ordered, REQUIREDDATE=ordered + datetime.timedelta(days=rng.randint(5, 10)),
+                     SHIPPEDDATE=None, CANCELLEDDATE=None, STATUS=status,
+                     CUSTOMERNUMBER=103 + skewed_index(rng, self.counts['CUSTOMERS'], CUSTOMER_SKEW),
+                     CREATE_TIMESTAMP=created, UPDATE_TIMESTAMP=created)
+        if status in ('Shipped', 'Resolved', 'Disputed'):
+            order['SHIPPEDDATE'] = ordered + datetime.timedelta(days=rng.randint(1, 6))
+        elif status == 'Cancelled':
+            order['CANCELLEDDATE'] = ordered + datetime.timedelta(days=rng.randint(1, 6))
+        closed = order['SHIPPEDDATE'] or order['CANCELLEDDATE']
+        if closed:
+            order['UPDATE_TIMESTAMP'] = min(at_time(closed, rng), self._snapshot_end())
+        return order
+
+    def orderdetails(self, order):
+        """Lines for an order header, most of them for the best-selling products."""
+        index = order['ORDERNUMBER'] - 10100
+        rng = self._rng('ORDERDETAILS', index)
+        products = self.counts['PRODUCTS']
+        wanted = min(rng.randint(1, 17), products)
+        chosen = []
+        while len(chosen) < wanted:
+            product = skewed_index(rng, products, PRODUCT_SKEW)
+            if product not in chosen:
+                chosen.append(product)
+        return [dict(ORDERNUMBER=order['ORDERNUMBER'], PRODUCTCODE=self.product_code(product), QUANTITYORDERED=rng.randint(10, 99),
+                     PRICEEACH=round(self.msrp(product) * rng.uniform(0.8, 1.0), 2), ORDERLINENUMBER=line,
+                     CREATE_TIMESTAMP=order['CREATE_TIMESTAMP'], UPDATE_TIMESTAMP=order['CREATE_TIMESTAMP'])
+                for line, product in enumerate(chosen, start=1)]
+
+    def payment(self, index, paid=None):
+        rng = self._rng('PAYMENTS', index)
+        if paid is None:
+            paid = self._date_of(index, self.counts['PAYMENTS'], rng)
+        created = at_time(paid, rng)
+        return dict(CUSTOMERNUMBER=103 + skewed_index(rng, self.counts['CUSTOMERS'], CUSTOMER_SKEW),
+                    CHECKNUMBER=f"{chr(65 + index % 26)}{chr(65 + index // 26 % 26)}{100000 + index}",
+                    PAYMENTDATE=paid, AMOUNT=round(rng.lognormvariate(10, 0.8), 2), CREATE_TIMESTAMP=created, UPDATE_TIMESTAMP=created)
+
+    def snapshot(self):
+        """Yield (table_name, row iterator) for every table, parents before children."""
+        counts = self.counts
+        yield 'OFFICES', (self._row('OFFICES', self.office(i)) for i in range(counts['OFFICES']))
+        yield 'EMPLOYEES', (self._row('EMPLOYEES', self.employee(i)) for i in range(counts['EMPLOYEES']))
+        yield 'CUSTOMERS', (self._row('CUSTOMERS', self.customer(i)) for i in range(counts['CUSTOMERS']))
+        yield 'PRODUCTLINES', (self._row('PRODUCTLINES', self.productline(name)) for name in PRODUCT_LINES)
+        yield 'PRODUCTS', (self._row('PRODUCTS', self.product(i)) for i in range(counts['PRODUCTS']))
+        yield 'ORDERS', (self._row('ORDERS', self.order(i)) for i in range(counts['ORDERS']))
+        yield 'ORDERDETAILS', (self._row('ORDERDETAILS', line) for i in range(counts['ORDERS']) for line in self.orderdetails(self.order(i)))
+        yield 'PAYMENTS', (self._row('PAYMENTS', self.payment(i)) for i in range(counts['PAYMENTS']))
+
+    # Daily deltas
+
+    def _daily_new(self, table_name, day):
+        rng = self._rng('DAILY_NEW', table_name, day)
+        rate = DAILY_NEW[table_name] * self.scale
+        return int(rate * rng.uniform(0.5, 1.5) + rng.random())
+
+    def _first_new_index(self, table_name, day):
+        """Index of the first entity created on delta day `day`; earlier days' new entities come before it."""
+        return self.counts[table_name] + sum(self._daily_new(table_name, earlier) for earlier in range(1, day))
+
+    def delta(self, day):
+        """Return {table_name: [row, ...]} for delta day `day` (1 is the as_of date itself).
+
+        Updated rows are the snapshot version of the row with the day's change applied, so a row
+        changed on several days does not carry earlier deltas' changes forward.
+        """
+        if day < 1:
+            raise ValueError(f"delta days start at 1, got {day}")
+        date = self.as_of + datetime.timedelta(days=day - 1)
+        rng = self._rng('DELTA', day)
+        rows = {table_name: [] for table_name in tables}
+
+        def add(table_name, values):
+            rows[table_name].append(self._row(table_name, values))
+
+        def changed(values):
+            values['UPDATE_TIMESTAMP'] = max(at_time(date, rng), values['CREATE_TIMESTAMP'])
+            return values
+
+        first = {table_name: self._first_new_index(table_name, day) for table_name in DAILY_NEW}
+        for index in range(first['CUSTOMERS'], first['CUSTOMERS'] + self._daily_new('CUSTOMERS', day)):
+            add('CUSTOMERS', self.customer(index, created=at_time(date, rng, last_hour=12)))
+        for index in range(first['PRODUCTS'], first['PRODUCTS'] + self._daily_new('PRODUCTS', day)):
+            add('PRODUCTS', self.product(index, created=at_time(date, rng, last_hour=12)))
+        for index in range(first['ORDERS'], first['ORDERS'] + self._daily_new('ORDERS', day)):
+            order = self.order(index, ordered=date)
+            order.update(STATUS='In Process', SHIPPEDDATE=None, CANCELLEDDATE=None, UPDATE_TIMESTAMP=order['CREATE_TIMESTAMP'])
+            add('ORDERS', order)
+            for line in self.orderdetails(order):
+                add('ORDERDETAILS', line)
+        for index in range(first['PAYMENTS'], first['PAYMENTS'] + self._daily_new('PAYMENTS', day)):
+            add('PAYMENTS', self.payment(index, paid=date))
+
+        # Orders still open at the snapshot are shipped or cancelled over the next OPEN_ORDER_DAYS days, each once
+        recent = self.counts['ORDERS'] - int(self.counts['ORDERS'] * (1 - OPEN_ORDER_DAYS / self.span_days) ** 2)
+        for index in range(self.counts['ORDERS'] - recent, self.counts['ORDERS']):
+            if day > OPEN_ORDER_DAYS or index % OPEN_ORDER_DAYS != day - 1:
+                continue
+            order = self.order(index)
+            if order['STATUS'] in OPEN_STATUSES:
+                if rng.random() < 0.95:
+                    order.update(STATUS='Shipped', SHIPPEDDATE=date)
+                else:
+                    order.update(STATUS='Cancelled', CANCELLEDDATE=date)
+                add('ORDERS', changed(order))
+        # Credit reviews favour active customers; stock moves on the best sellers
+        for _ in range(int(DAILY_UPDATED['CUSTOMERS'] * self.counts['CUSTOMERS'] + rng.random())):
+            customer = self.customer(skewed_index(rng, self.counts['CUSTOMERS'], CUSTOMER_SKEW))
+            if customer['CREDITLIMIT']:
+                customer['CREDITLIMIT'] = max(0, customer['CREDITLIMIT'] + rng.randrange(-20000, 40000, 100))
+                add('CUSTOMERS', changed(customer))
+        for _ in range(int(DAILY_UPDATED['PRODUCTS'] * self.counts['PRODUCTS'] + rng.random())):
+            product = self.product(skewed_index(rng, self.counts['PRODUCTS'], PRODUCT_SKEW))
+            product['QUANTITYINSTOCK'] = max(0, product['QUANTITYINSTOCK'] - rng.randint(10, 500))
+            if rng.random() < 0.05:
+                product['MSRP'] = round(product['MSRP'] * rng.uniform(0.95, 1.1), 2)
+            add('PRODUCTS', changed(product))
+        for _ in range(int(DAILY_UPDATED['EMPLOYEES'] * self.counts['EMPLOYEES'] + rng.random())):
+            employee = self.employee(rng.randrange(self.counts['EMPLOYEES']))
+            employee['EXTENSION'] = f"x{1000 + rng.randint(0, 8999)}"
+            add('EMPLOYEES', changed(employee))
+
+        # A row updated twice in one day keeps its last version
+        for table_name, table_rows in rows.items():
+            key_positions = [tables[table_name]['columns'].index(column) for column in tables[table_name]['primary_key']]
+            latest = {tuple(row[position] for position in key_positions): row for row in table_rows}
+            rows[table_name] = list(latest.values())
+        return rows
+
+
+def sqlite_value(value):
+    return str(value) if isinstance(value, datetime.date) else value
+
+def write_sqlite(path, table_rows):
+    """Upsert (table_name, rows) into a sqlite copy of the source schema; returns {table_name: rows written}."""
+    connection = sqlite3.connect(path)
+    written = {}
+    for table_name, rows in table_rows:
+        columns = tables[table_name]['columns']
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)}, "
+                           f"PRIMARY KEY ({', '.join(tables[table_name]['primary_key'])}))")
+        cursor = connection.executemany(
+            f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            ([sqlite_value(value) for value in row] for row in rows)
+        )
+        written[table_name] = cursor.rowcount
+    connection.commit()
+    connection.close()
+    return written
+
+def write_csv_files(directory, table_rows):
+    """Write each table to directory/TABLE.csv with a header row; returns {table_name: rows written}."""
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for table_name, rows in table_rows:
+        with open(os.path.join(directory, f"{table_name}.csv"), 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file, lineterminator="\n")
+            writer.writerow(tables[table_name]['columns'])
+            written[table_name] = 0
+            for row in rows:
+                writer.writerow(row)
+                written[table_name] += 1
+    return written
+
+def write_oracle(table_rows, batch_size=10000):
+    """MERGE (table_name, rows) into the Oracle source schema by primary key; returns {table_name: rows written}."""
+    import oracledb
+    oracledb.init_oracle_client(lib_dir=os.getenv('d'))
+    connection = oracledb.connect(user=source_username, password=source_password, dsn=source_dsn)
+    written = {}
+    try:
+        with connection.cursor() as cursor:
+            for table_name, rows in table_rows:
+                columns = tables[table_name]['columns']
+                keys = tables[table_name]['primary_key']
+                others = [column for column in columns if column not in keys]
+                merge = f"""
+                    MERGE INTO {table_name} t
+                    USING (SELECT {', '.join(f':{position + 1} AS {column}' for position, column in enumerate(columns))} FROM dual) s
+                    ON ({' AND '.join(f't.{column} = s.{column}' for column in keys)})
+                    WHEN MATCHED THEN UPDATE SET {', '.join(f't.{column} = s.{column}' for column in others)}
+                    WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) VALUES ({', '.join(f's.{column}' for column in columns)})
+                """
+                written[table_name] = 0
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        cursor.executemany(merge, batch)
+                        written[table_name] += len(batch)
+                        batch = []
+                if batch:
+                    cursor.executemany(merge, batch)
+                    written[table_name] += len(batch)
+                connection.commit()
+                print(f"Merged {written[table_name]} rows into {table_name}")
+    finally:
+        connection.close()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1, help=f"Multiple of the sample's row counts, 1 to {MAX_SCALE} (default: 1)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start-date', type=datetime.date.fromisoformat, default=datetime.date(2003, 1, 6),
+                        help="Date of the first order (default: 2003-01-06)")
+    parser.add_argument('--as-of', type=datetime.date.fromisoformat, default=datetime.date(2005, 6, 9),
+                        help="The snapshot holds everything before this date (default: 2005-06-09)")
+    parser.add_argument('--delta-days', type=int, default=0, help="Also generate this many daily deltas from --as-of on")
+    parser.add_argument('--skip-snapshot', action='store_true', help="Only generate the deltas")
+    parser.add_argument('--sqlite', help="Upsert into this sqlite database")
+    parser.add_argument('--csv', help="Write CSV files under this directory (snapshot/ and delta_YYYY-MM-DD/)")
+    parser.add_argument('--oracle', action='store_true', help="Merge into the Oracle source schema (DBLINK_USERNAME)")
+    args = parser.parse_args()
+    if not (args.sqlite or args.csv or args.oracle):
+        parser.error("choose at least one of --sqlite, --csv and --oracle")
+
+    generator = ClassicModelsGenerator(args.scale, args.seed, args.start_date, args.as_of)
+    batches = []
+    if not args.skip_snapshot:
+        batches.append(('snapshot', generator.snapshot))
+    for day in range(1, args.delta_days + 1):
+        date = args.as_of + datetime.timedelta(days=day - 1)
+        batches.append((f"delta_{date}", lambda day=day: generator.delta(day).items()))
+
+    for name, table_rows in batches:
+        start_time = time.perf_counter()
+        # Each target gets its own pass; rows are rebuilt rather than held in memory
+        for target, write in (('sqlite', args.sqlite and (lambda rows: write_sqlite(args.sqlite, rows))),
+                              ('csv', args.csv and (lambda rows: write_csv_files(os.path.join(args.csv, name), rows))),
+                              ('oracle', args.oracle and write_oracle)):
+            if write:
+                written = write(table_rows())
+                print(f"{name} -> {target}: {sum(written.values()):,} rows {written}")
+        print(f"{name} generated in {time.perf_counter() - start_time:.2f}s")
+
+if __name__ == "__main__":
+    main()
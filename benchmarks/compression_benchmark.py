@@ -0,0 +1,86 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Load environment variables (S3 settings are only needed with --upload)
+load_dotenv()
+
+ORDERDETAILS_COLUMNS = ['ORDERNUMBER', 'PRODUCTCODE', 'QUANTITYORDERED', 'PRICEEACH', 'ORDERLINENUMBER', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP']
+
+def synthetic_orderdetails_csv(row_count, seed=42):
+    """Build an ORDERDETAILS-shaped CSV extract in memory, header included."""
+    rng = random.Random(seed)
+    base = datetime(2005, 6, 9)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(ORDERDETAILS_COLUMNS)
+    for i in range(row_count):
+        created = base - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        writer.writerow([
+            10100 + i // 10,
+            f"S{rng.randint(10, 72)}_{rng.randint(1000, 4999)}",
+            rng.randint(10, 99),
+            f"{rng.uniform(20, 250):.2f}",
+            i % 10 + 1,
+            created,
+            created + timedelta(minutes=rng.randint(0, 600)),
+        ])
+    return buffer.getvalue().encode('utf-8')
+
+def codecs_to_test():
+    """Yield (label, compress function) for every codec/level combination available here."""
+    yield 'none', lambda data: data
+    for level in (1, 6, 9):
+        yield f'gzip-{level}', lambda data, level=level: gzip.compress(data, compresslevel=level)
+    try:
+        import zstandard
+    except ImportError:
+        print("zstandard is not installed; skipping zstd codecs.")
+        return
+    for level in (1, 3, 9, 19):
+        yield f'zstd-{level}', lambda data, level=level: zstandard.ZstdCompressor(level=level).compress(data)
+
+def upload_seconds(s3_client, bucket_name, key, body):
+    start = time.perf_counter()
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=body)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bytes moved and wall time for each extract compression codec.")
+    parser.add_argument('--csv', help="Existing CSV extract to compress (default: synthetic ORDERDETAILS rows)")
+    parser.add_argument('--rows', type=int, default=500000, help="Synthetic row count when --csv is not given")
+    parser.add_argument('--upload', action='store_true', help="Also time a put_object of each result to S3_BUCKET_NAME")
+    args = parser.parse_args()
+
+    if args.csv:
+        with open(args.csv, 'rb') as inputfile:
+            data = inputfile.read()
+    else:
+        data = synthetic_orderdetails_csv(args.rows)
+
+    s3_client = None
+    if args.upload:
+        import boto3
+        s3_client = boto3.client('s3', region_name=os.getenv('AWS_REGION'), endpoint_url=os.getenv('S3_ENDPOINT_URL'))
+        bucket_name = os.getenv('S3_BUCKET_NAME')
+
+    print(f"Input: {len(data):,} bytes")
+    print(f"{'codec':<10} {'bytes':>14} {'ratio':>7} {'compress s':>11} {'MB/s':>8} {'upload s':>9}")
+    for label, compress in codecs_to_test():
+        start = time.perf_counter()
+        compressed = compress(data)
+        elapsed = time.perf_counter() - start
+        throughput = len(data) / elapsed / 1024 / 1024 if elapsed > 0 else float('inf')
+        upload = ''
+        if s3_client:
+            upload = f"{upload_seconds(s3_client, bucket_name, f'benchmarks/compression/{label}', compressed):.2f}"
+        print(f"{label:<10} {len(compressed):>14,} {len(data) / len(compressed):>7.2f} {elapsed:>11.3f} {throughput:>8.1f} {upload:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Sweep cursor.arraysize / prefetchrows for the Oracle extract and save the fastest settings.
+
+Each setting runs in its own subprocess that fetches the table through the engine's session
+pool (same .env as extract_engine.py) and encodes it as CSV into a byte-counting sink, so
+both rows/sec and the peak RSS of that one run are measured. With --save the winner per
+table is merged into the engine's FETCH_TUNING_FILE (fetch_tuning.json by default), which
+export_table() then uses automatically.
+
+--synthetic ROWS runs an ORDERDETAILS-shaped CONNECT BY query instead of a real table. It
+is generated in the local session, so it measures fetch and encode cost without the
+@parva_dblink hop (real tables are read the way the engine reads them, see EXTRACT_SOURCE_MODE); its winner is saved as the 'default' entry used by untuned tables.
+
+Run from the repository root:  python -m benchmarks.fetch_tuning_benchmark --tables ORDERDETAILS --save
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import extract_engine
+from benchmarks.arrow_fetch_benchmark import CountingSink
+from extract_engine import acquire_session, fetch_batches, source_object, table_source_mode, tables, write_csv
+
+SYNTHETIC_QUERY = """
+    SELECT 10100 + TRUNC(LEVEL / 10) AS ORDERNUMBER,
+           'S' || MOD(LEVEL, 72) || '_' || MOD(LEVEL * 7, 4999) AS PRODUCTCODE,
+           MOD(LEVEL, 90) + 10 AS QUANTITYORDERED,
+           MOD(LEVEL * 37, 23000) / 100 AS PRICEEACH,
+           MOD(LEVEL, 10) + 1 AS ORDERLINENUMBER,
+           TIMESTAMP '2005-06-09 00:00:00' - NUMTODSINTERVAL(LEVEL, 'SECOND') AS CREATE_TIMESTAMP,
+           TIMESTAMP '2005-06-09 00:00:00' - NUMTODSINTERVAL(LEVEL / 2, 'SECOND') AS UPDATE_TIMESTAMP
+    FROM dual
+    CONNECT BY LEVEL <= :row_count
+"""
+
+def target_query(table_name, synthetic_rows):
+    """Return (sql, binds, source mode) for the worker to fetch."""
+    if synthetic_rows:
+        return SYNTHETIC_QUERY, {'row_count': synthetic_rows}, 'link'
+    source_mode = table_source_mode(table_name)
+    return f"SELECT {', '.join(tables[table_name]['columns'])} FROM {source_object(table_name, source_mode)}", {}, source_mode
+
+def run_worker(args):
+    """Fetch once with the given settings and print {"rows", "seconds"} as the last stdout line."""
+    sql_query, params, source_mode = target_query(args.worker, args.synthetic)
+    sink = CountingSink()
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            cursor.arraysize = args.arraysize
+            cursor.prefetchrows = args.prefetchrows
+            start_time = time.perf_counter()
+            cursor.execute(sql_query, params)
+            columns = [column[0] for column in cursor.description]
+            row_count = write_csv(columns, fetch_batches(cursor, cursor.fetchmany()), sink)
+            elapsed = time.perf_counter() - start_time
+    print(json.dumps({'rows': row_count, 'seconds': elapsed}))
+
+def measure(table_name, synthetic_rows, arraysize, prefetchrows):
+    """Run one worker subprocess; returns its result with peak_rss_mb, or None if it failed."""
+    command = [sys.executable, '-m', 'benchmarks.fetch_tuning_benchmark', '--worker', table_name,
+               '--arraysize', str(arraysize), '--prefetchrows', str(prefetchrows)]
+    if synthetic_rows:
+        command += ['--synthetic', str(synthetic_rows)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    output = process.stdout.read()
+    # wait4 reports the resource usage of this child alone
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        print(f"{table_name} arraysize={arraysize} prefetchrows={prefetchrows} failed with exit code {process.returncode}")
+        return None
+    result = json.loads(output.strip().splitlines()[-1])
+    # ru_maxrss is in kilobytes on Linux
+    result['peak_rss_mb'] = usage.ru_maxrss / 1024
+    return result
+
+def prefetch_values(arraysize, options):
+    """Expand the --prefetchrows options for one arraysize; 'auto' means arraysize + 1, like the engine."""
+    return sorted({arraysize + 1 if option == 'auto' else int(option) for option in options})
+
+def save_tuning(path, results):
+    """Merge {table: settings} into the tuning file read by extract_engine."""
+    tuning = extract_engine.load_fetch_tuning(path)
+    tuning.update(results)
+    with open(path, 'w') as tuning_file:
+        json.dump(tuning, tuning_file, indent=2, sort_keys=True)
+    print(f"Saved tuned fetch settings for {', '.join(results)} to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', nargs='+', default=['ORDERDETAILS'], choices=list(tables))
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help="Sweep a generated ORDERDETAILS-shaped result instead of --tables")
+    parser.add_argument('--arraysizes', nargs='+', type=int, default=[100, 500, 1000, 5000, 10000, 50000])
+    parser.add_argument('--prefetchrows', nargs='+', default=['auto', '0'],
+                        help="Values to try per arraysize; 'auto' is arraysize + 1 (default: auto 0)")
+    parser.add_argument('--repeat', type=int, default=2, help="Runs per setting; the fastest is kept")
+    parser.add_argument('--max-rss-mb', type=float, help="Ignore settings whose peak RSS exceeds this")
+    parser.add_argument('--save', action='store_true', help="Write the best setting per table to FETCH_TUNING_FILE")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--arraysize', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.prefetchrows = int(args.prefetchrows[0])
+        run_worker(args)
+        return
+
+    targets = ['default'] if args.synthetic else args.tables
+    best = {}
+    print(f"{'table':<14} {'arraysize':>10} {'prefetch':>9} {'rows':>10} {'seconds':>8} {'rows/sec':>11} {'peak RSS MB':>12}")
+    for table_name in targets:
+        for arraysize in args.arraysizes:
+            for prefetchrows in prefetch_values(arraysize, args.prefetchrows):
+                runs = [measure(table_name, args.synthetic, arraysize, prefetchrows) for _ in range(args.repeat)]
+                runs = [run for run in runs if run]
+                if not runs:
+                    continue
+                result = min(runs, key=lambda run: run['seconds'])
+                rows_per_sec = result['rows'] / result['seconds'] if result['seconds'] > 0 else float(result['rows'])
+                peak_rss_mb = max(run['peak_rss_mb'] for run in runs)
+                print(f"{table_name:<14} {arraysize:>10,} {prefetchrows:>9,} {result['rows']:>10,} {result['seconds']:>8.2f} "
+                      f"{rows_per_sec:>11,.0f} {peak_rss_mb:>12.1f}")
+                if args.max_rss_mb and peak_rss_mb > args.max_rss_mb:
+                    continue
+                if table_name not in best or rows_per_sec > best[table_name]['rows_per_sec']:
+                    best[table_name] = {'arraysize': arraysize, 'prefetchrows': prefetchrows,
+                                        'rows_per_sec': round(rows_per_sec), 'peak_rss_mb': round(peak_rss_mb, 1)}
+
+    for table_name, settings in best.items():
+        print(f"Best for {table_name}: arraysize={settings['arraysize']} prefetchrows={settings['prefetchrows']} "
+              f"({settings['rows_per_sec']:,} rows/sec, {settings['peak_rss_mb']} MB peak RSS)")
+    if args.save and best:
+        save_tuning(extract_engine.fetch_tuning_file, best)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,669 @@
+"""Run the whole extract -> S3 -> COPY -> stage_to_dw pipeline locally and time every stage.
+
+Nothing here talks to Oracle, S3 or Redshift. The source schema is a sqlite database seeded
+by benchmarks.classicmodels_generator and handed to extract_engine as its session pool, S3 is an
+in-memory stand-in for the client calls the pipeline makes (or a real emulator such as MinIO
+with --s3-endpoint-url), and the warehouse is a sqlite database with devstage, devdw and
+etl_metadata attached. Warehouse statements are rewritten from the Redshift dialect the
+scripts use, and COPY reads the exporter's manifest and files back from the S3 stand-in.
+
+The real scripts run unchanged: extract_engine.run_exports(), truncate_stage.py, every
+loader in master_s3_to_stage.py and every script in master_stage_to_dw.py, in that order.
+The first batch loads the generated snapshot; --delta-days N then applies the generator's
+daily deltas to the source one day at a time and runs an incremental batch for each. The
+report shows wall time per stage and per script for every batch, then etl_metadata.hop_metrics
+summed per batch, table and hop. EXTRACT_*, ORACLE_ARRAYSIZE and the other engine settings are read from
+the environment as usual, so two runs with different settings can be compared directly.
+
+The sqlite source reports no column types (every type_code is None) and returns its own
+str/int/float values, timestamps included as text. So EXTRACT_FORMAT=parquet, whose column
+types come from the Oracle type codes, is refused. EXTRACT_CHECKPOINT runs, but resuming from a
+checkpoint compares restored datetimes with text timestamps unless EXTRACT_FAST_CONVERT=1.
+
+Run from the repository root:  python -m benchmarks.local_pipeline_benchmark --scale 10 --delta-days 3 --output run.json
+"""
+import argparse
+import collections
+import csv
+import datetime
+import decimal
+import gzip
+import hashlib
+import importlib.util
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import types
+
+from botocore.exceptions import ClientError
+
+import extract_engine
+from benchmarks.classicmodels_generator import ClassicModelsGenerator, write_sqlite
+from extract_engine import change_log_name, tables
+from master_s3_to_stage import scripts as loader_scripts
+from master_stage_to_dw import scripts as stage_to_dw_scripts
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# sqlite hands DATE columns (etl_metadata.batch_control) back as dates, as Redshift does
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_converter('DATE', lambda value: datetime.date.fromisoformat(value.decode()[:10]))
+
+
+class LocalS3:
+    """In-memory stand-in for the boto3 S3 client calls made by the exporter and the loaders.
+
+    Missing buckets, keys and uploads raise botocore ClientError with the codes S3 uses.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.uploads = {}
+        self.upload_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _error(self, code, operation):
+        raise ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+    def _objects(self, bucket, operation):
+        if bucket not in self.buckets:
+            self._error('NoSuchBucket', operation)
+        return self.buckets[bucket]
+
+    def _upload(self, upload_id, operation):
+        if upload_id not in self.uploads:
+            self._error('NoSuchUpload', operation)
+        return self.uploads[upload_id]
+
+    def head_bucket(self, Bucket):
+        if Bucket not in self.buckets:
+            self._error('404', 'HeadBucket')
+        return {}
+
+    def create_bucket(self, Bucket, **kwargs):
+        with self.lock:
+            self.buckets.setdefault(Bucket, {})
+        return {}
+
+    def put_object(self, Bucket, Key, Body):
+        with self.lock:
+            self._objects(Bucket, 'PutObject')[Key] = bytes(Body)
+        return {}
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            objects = self._objects(Bucket, 'GetObject')
+            if Key not in objects:
+                self._error('NoSuchKey', 'GetObject')
+            data = objects[Key]
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+    def delete_object(self, Bucket, Key):
+        with self.lock:
+            self._objects(Bucket, 'DeleteObject').pop(Key, None)
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key):
+        with self.lock:
+            self._objects(Bucket, 'CreateMultipartUpload')
+            upload_id = f"upload-{next(self.upload_ids)}"
+            self.uploads[upload_id] = {'bucket': Bucket, 'key': Key, 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        body = bytes(Body)
+        with self.lock:
+            self._upload(UploadId, 'UploadPart')['parts'][PartNumber] = body
+        return {'ETag': f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def list_parts(self, Bucket, Key, UploadId, **kwargs):
+        with self.lock:
+            parts = self._upload(UploadId, 'ListParts')['parts']
+            return {'Parts': [{'PartNumber': number, 'Size': len(body)} for number, body in sorted(parts.items())]}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with self.lock:
+            parts = self._upload(UploadId, 'CompleteMultipartUpload')['parts']
+            self._objects(Bucket, 'CompleteMultipartUpload')[Key] = b''.join(
+                parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+            del self.uploads[UploadId]
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self.lock:
+            self._upload(UploadId, 'AbortMultipartUpload')
+            del self.uploads[UploadId]
+        return {}
+
+    def stored_bytes(self):
+        with self.lock:
+            return sum(len(data) for objects in self.buckets.values() for data in objects.values())
+
+
+def oracle_to_sqlite(statement):
+    """Rewrite an extract query for the sqlite source: the link, AS OF SCN and TO_TIMESTAMP literals go,
+    and the current SCN is read from enable_change_capture()'s source_scn table. sqlite has a single
+    version of every row, so AS OF reads see the latest one."""
+    statement = statement.replace('@parva_dblink', '')
+    statement = re.sub(r"\s+AS OF SCN \d+", "", statement)
+    statement = re.sub(r"DBMS_FLASHBACK\.GET_SYSTEM_CHANGE_NUMBER\s+FROM\s+dual", "scn FROM source_scn", statement)
+    return re.sub(r"TO_TIMESTAMP\(('[^']*'),\s*'[^']*'\)", r"\1", statement)
+
+def enable_change_capture(path):
+    """Give the sqlite source what EXTRACT_INCREMENTAL=scn and changelog read in Oracle.
+
+    source_scn holds the current SCN, which commit_source() advances. Every row gets an ORA_ROWSCN
+    column, and the per-table logs of create_change_log.py are kept by triggers. Rows written
+    after the SCN was last advanced carry the next one, as if their transaction committed at it.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS source_scn (scn INTEGER NOT NULL)")
+    if connection.execute("SELECT COUNT(*) FROM source_scn").fetchone()[0] == 0:
+        connection.execute("INSERT INTO source_scn VALUES (1)")
+    next_scn = "(SELECT scn + 1 FROM source_scn)"
+    for table_name, table in tables.items():
+        columns = [column[1] for column in connection.execute(f"PRAGMA table_info({table_name})")]
+        if 'ORA_ROWSCN' not in columns:
+            connection.execute(f"ALTER TABLE {table_name} ADD COLUMN ORA_ROWSCN INTEGER NOT NULL DEFAULT 1")
+        keys = table['primary_key']
+        log_name = change_log_name(table_name)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {log_name} ({', '.join(keys)}, OPERATION, CHANGED_AT, ORA_ROWSCN)")
+        log_columns = f"{log_name} ({', '.join(keys)}, OPERATION, CHANGED_AT, ORA_ROWSCN)"
+        # Stamping ORA_ROWSCN updates no data column, so it does not fire the UPDATE OF trigger again
+        for event, row, operation in ((f"INSERT ON {table_name}", 'NEW', 'I'),
+                                      (f"UPDATE OF {', '.join(table['columns'])} ON {table_name}", 'NEW', 'U'),
+                                      (f"DELETE ON {table_name}", 'OLD', 'D')):
+            stamp = (f"UPDATE {table_name} SET ORA_ROWSCN = {next_scn} WHERE rowid = NEW.rowid;"
+                     if row == 'NEW' else "")
+            connection.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table_name}_CHANGE_LOG_{operation} AFTER {event}
+                BEGIN
+                    {stamp}
+                    INSERT INTO {log_columns}
+                    VALUES ({', '.join(f'{row}.{key}' for key in keys)}, '{operation}', CURRENT_TIMESTAMP, {next_scn});
+                END
+            """)
+    connection.commit()
+    connection.close()
+
+def commit_source(path):
+    """Advance the sqlite source's SCN past the rows written since the last call."""
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE source_scn SET scn = scn + 1")
+    connection.commit()
+    connection.close()
+
+
+SourceColumn = collections.namedtuple('SourceColumn', 'name type_code display_size internal_size precision scale null_ok')
+
+
+class SourceCursor:
+    """The part of the oracledb cursor API extract_engine uses, over one sqlite cursor."""
+
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+        self.arraysize = 100
+        self.prefetchrows = 2
+        # Accepted and ignored: sqlite already returns str/int/float values
+        self.outputtypehandler = None
+
+    @property
+    def description(self):
+        # Named like oracledb's FetchInfo; sqlite reports no column types
+        if self._cursor.description is None:
+            return None
+        return [SourceColumn(column[0], None, None, None, None, None, True) for column in self._cursor.description]
+
+    def execute(self, statement, parameters=None):
+        # Session NLS settings have no sqlite equivalent; timestamps are already ISO text
+        if statement.lstrip().upper().startswith('ALTER SESSION'):
+            return
+        self._cursor.execute(oracle_to_sqlite(statement), parameters or {})
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self.arraysize)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SourceSession:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        return SourceCursor(self.connection)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class SourcePool:
+    """Stands in for extract_engine's oracledb session pool; each session is its own sqlite connection."""
+
+    def __init__(self, path, session_callback=None):
+        self.path = path
+        self.session_callback = session_callback
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        session = SourceSession(self.path)
+        if self.session_callback:
+            self.session_callback(session, None)
+        return session
+
+    def release(self, session):
+        with self.lock:
+            self.idle.append(session)
+
+    def close(self):
+        with self.lock:
+            for session in self.idle:
+                session.close()
+            self.idle = []
+
+
+# devdw tables as the stage_to_dw scripts use them; dw_*_id columns are the IDENTITY surrogate keys
+DEVDW_TABLES = {
+    'offices': "dw_office_id INTEGER PRIMARY KEY, officeCode, city, phone, addressLine1, addressLine2, state, country, "
+               "postalCode, territory",
+    'employees': "dw_employee_id INTEGER PRIMARY KEY, employeeNumber, lastName, firstName, extension, email, officeCode, "
+                 "reportsTo, jobTitle, dw_office_id, dw_reporting_employee_id",
+    'customers': "dw_customer_id INTEGER PRIMARY KEY, src_customerNumber, customerName, contactLastName, contactFirstName, "
+                 "phone, addressLine1, addressLine2, city, state, postalCode, country, salesRepEmployeeNumber, creditLimit, "
+                 "dw_sales_employee_id",
+    'productlines': "dw_product_line_id INTEGER PRIMARY KEY, productLine",
+    'products': "dw_product_id INTEGER PRIMARY KEY, src_productCode, productName, productLine, productScale, productVendor, "
+                "quantityInStock, buyPrice, MSRP, dw_product_line_id",
+    'orders': "dw_order_id INTEGER PRIMARY KEY, dw_customer_id, src_orderNumber, orderDate, requiredDate, cancelledDate, "
+              "shippedDate, status, src_customerNumber",
+    'orderdetails': "dw_orderdetail_id INTEGER PRIMARY KEY, dw_order_id, dw_product_id, src_orderNumber, src_productCode, "
+                    "quantityOrdered, priceEach, orderLineNumber",
+    'payments': "dw_payment_id INTEGER PRIMARY KEY, dw_customer_id, src_customerNumber, checkNumber, paymentDate, amount",
+    'customer_history': "dw_customer_id, creditLimit, effective_from_date, effective_to_date, dw_active_record_ind, "
+                        "create_etl_batch_no, create_etl_batch_date, update_etl_batch_no, update_etl_batch_date, "
+                        "dw_create_timestamp DEFAULT CURRENT_TIMESTAMP, dw_update_timestamp",
+    'product_history': "dw_product_id, MSRP, effective_from_date, effective_to_date, dw_active_record_ind, "
+                       "create_etl_batch_no, create_etl_batch_date, update_etl_batch_no, update_etl_batch_date, "
+                       "dw_create_timestamp DEFAULT CURRENT_TIMESTAMP, dw_update_timestamp",
+    'daily_customer_summary': "summary_date, dw_customer_id, order_count, order_apd, order_amount, order_cost_amount, "
+                              "order_mrp_amount, products_ordered_qty, products_items_qty, cancelled_order_count, "
+                              "cancelled_order_amount, cancelled_order_apd, shipped_order_count, shipped_order_amount, "
+                              "shipped_order_apd, payment_apd, payment_amount, new_customer_apd, new_customer_paid_apd, "
+                              "create_timestamp, etl_batch_no, etl_batch_date",
+    'daily_product_summary': "summary_date, dw_product_id, customer_apd, product_cost_amount, product_mrp_amount, "
+                             "cancelled_product_qty, cancelled_cost_amount, cancelled_mrp_amount, cancelled_order_apd, "
+                             "dw_create_timestamp, etl_batch_no, etl_batch_date",
+    'monthly_customer_summary': "start_of_the_month_date, dw_customer_id, order_count, order_apd, order_apm, order_amount, "
+                                "order_cost_amount, order_mrp_amount, products_ordered_qty, products_items_qty, "
+                                "cancelled_order_count, cancelled_order_amount, cancelled_order_apd, cancelled_order_apm, "
+                                "shipped_order_count, shipped_order_amount, shipped_order_apd, shipped_order_apm, payment_apd, "
+                                "payment_apm, payment_amount, new_customer_apd, new_customer_apm, new_customer_paid_apd, "
+                                "new_customer_paid_apm, dw_create_timestamp DEFAULT CURRENT_TIMESTAMP, dw_update_timestamp, "
+                                "etl_batch_no, etl_batch_date",
+    'monthly_product_summary': "start_of_the_month_date, dw_product_id, customer_apd, customer_apm, product_cost_amount, "
+                               "product_mrp_amount, cancelled_product_qty, cancelled_cost_amount, cancelled_mrp_amount, "
+                               "cancelled_order_apd, cancelled_order_apm, dw_create_timestamp DEFAULT CURRENT_TIMESTAMP, "
+                               "dw_update_timestamp, etl_batch_no, etl_batch_date",
+}
+# Row bookkeeping columns every entity table (the first eight) carries
+DEVDW_AUDIT_COLUMNS = ("src_create_timestamp, src_update_timestamp, dw_create_timestamp DEFAULT CURRENT_TIMESTAMP, "
+                       "dw_update_timestamp, etl_batch_no, etl_batch_date")
+
+# Redshift -> sqlite rewrites, applied in order, for the statements the loaders and stage_to_dw scripts run
+REDSHIFT_REWRITES = [
+    (r"%s", "?"),
+    (r"TO_CHAR\(([\w.]+),\s*'YYYY-MM-01'\)", r"strftime('%Y-%m-01', \1)"),
+    (r"TO_DATE\(('[^']*'),\s*'[^']*'\)", r"\1"),
+    (r"CAST\(([\w.]+) AS DATE\)", r"date(\1)"),
+    (r"::\w+", ""),
+    (r"('[^']*')\s*-\s*INTERVAL\s*'(\d+) days?'", r"date(\1, '-\2 day')"),
+    # sqlite only accepts an alias on the UPDATE target with AS
+    (r"UPDATE\s+(devdw\.\"?\w+\"?)\s+(?!AS\b|SET\b)(\w+)\s+SET\b", r"UPDATE \1 AS \2 SET"),
+    (r"TRUNCATE\s+TABLE", "DELETE FROM"),
+]
+
+def redshift_to_sqlite(statement):
+    for pattern, replacement in REDSHIFT_REWRITES:
+        statement = re.sub(pattern, replacement, statement, flags=re.IGNORECASE)
+    return statement
+
+COPY_PATTERN = re.compile(r"COPY\s+(?:\w+\.)?(\w+)\.(\w+)\s+FROM\s+'s3://([^/']+)/([^']+)'(.*)", re.IGNORECASE | re.DOTALL)
+
+
+class Warehouse:
+    """sqlite stand-in for the Redshift cluster, shared by every script in the run.
+
+    COPY statements are executed here: the manifest and its files are read back from `s3`,
+    decompressed and parsed, and the rows inserted into the devstage table.
+    """
+
+    def __init__(self, workdir, s3):
+        self.s3 = s3
+        self.lock = threading.RLock()
+        self.rollbacks = 0
+        # Every run starts from an empty warehouse, even in a reused --workdir
+        for name in ('warehouse', 'devstage', 'devdw', 'etl_metadata'):
+            if os.path.exists(os.path.join(workdir, f"{name}.db")):
+                os.remove(os.path.join(workdir, f"{name}.db"))
+        self.db = sqlite3.connect(os.path.join(workdir, 'warehouse.db'), check_same_thread=False,
+                                  detect_types=sqlite3.PARSE_DECLTYPES)
+        for schema in ('devstage', 'devdw', 'etl_metadata'):
+            self.db.execute(f"ATTACH DATABASE ? AS {schema}", (os.path.join(workdir, f"{schema}.db"),))
+        for table_name, table in tables.items():
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS devstage.{table_name.lower()} ({', '.join(table['columns'])})")
+        for position, (table_name, columns) in enumerate(DEVDW_TABLES.items()):
+            audit = f", {DEVDW_AUDIT_COLUMNS}" if position < len(tables) else ""
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS devdw.{table_name} ({columns}{audit})")
+        self.db.execute("CREATE TABLE IF NOT EXISTS etl_metadata.batch_control (etl_batch_no INTEGER, etl_batch_date DATE)")
+        self.db.commit()
+
+    def set_batch(self, batch_no, batch_date):
+        with self.lock:
+            self.db.execute("DELETE FROM etl_metadata.batch_control")
+            self.db.execute("INSERT INTO etl_metadata.batch_control VALUES (?, ?)", (batch_no, batch_date))
+            self.db.commit()
+
+    def connect(self):
+        return WarehouseConnection(self)
+
+    def copy(self, statement):
+        """Run a Redshift COPY ... MANIFEST from the S3 stand-in; returns the number of rows loaded."""
+        schema, table_name, bucket, key, options = COPY_PATTERN.match(statement.strip()).groups()
+        options = options.upper()
+        if 'MANIFEST' in options:
+            manifest = json.loads(self.s3.get_object(Bucket=bucket, Key=key)['Body'].read())
+            urls = [entry['url'] for entry in manifest['entries']]
+        else:
+            urls = [f"s3://{bucket}/{key}"]
+
+        row_count = 0
+        for url in urls:
+            file_bucket, file_key = url[len('s3://'):].split('/', 1)
+            data = self.s3.get_object(Bucket=file_bucket, Key=file_key)['Body'].read()
+            if re.search(r'\bPARQUET\b', options):
+                import pyarrow.parquet as pq
+                rows = [tuple(row.values()) for row in pq.read_table(io.BytesIO(data)).to_pylist()]
+            else:
+                if re.search(r'\bGZIP\b', options):
+                    data = gzip.decompress(data)
+                elif re.search(r'\bZSTD\b', options):
+                    import zstandard
+                    # Checkpointed extracts hold one zstd frame per part, so read across all of them
+                    data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+                reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+                if 'IGNOREHEADER 1' in options:
+                    next(reader, None)
+                # COPY ... CSV loads empty unquoted fields as NULL
+                rows = [[value if value != '' else None for value in row] for row in reader]
+            if rows:
+                placeholders = ', '.join('?' * len(rows[0]))
+                self.db.executemany(f"INSERT INTO {schema}.{table_name} VALUES ({placeholders})", rows)
+            row_count += len(rows)
+        return row_count
+
+
+class WarehouseCursor:
+    """The slice of the redshift_connector / psycopg2 cursor API the pipeline scripts use."""
+
+    def __init__(self, warehouse):
+        self.warehouse = warehouse
+        self._cursor = warehouse.db.cursor()
+        self._result = None
+        self.rowcount = -1
+
+    def execute(self, statement, parameters=()):
+        warehouse = self.warehouse
+        with warehouse.lock:
+            if statement.lstrip().upper().startswith('COPY'):
+                warehouse.last_copy_count = warehouse.copy(statement)
+                self._result, self.rowcount = [], warehouse.last_copy_count
+            elif 'pg_last_copy_count()' in statement:
+                self._result, self.rowcount = [(warehouse.last_copy_count,)], 1
+            else:
+                self._cursor.execute(redshift_to_sqlite(statement), parameters)
+                self._result, self.rowcount = None, self._cursor.rowcount
+
+    def fetchone(self):
+        if self._result is not None:
+            return self._result.pop(0) if self._result else None
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        if self._result is not None:
+            rows, self._result = self._result, []
+            return rows
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class WarehouseConnection:
+    def __init__(self, warehouse):
+        self.warehouse = warehouse
+
+    def cursor(self):
+        return WarehouseCursor(self.warehouse)
+
+    def commit(self):
+        with self.warehouse.lock:
+            self.warehouse.db.commit()
+
+    def rollback(self):
+        # Every script rolls back on error and carries on, so this is how a failed script shows up
+        with self.warehouse.lock:
+            self.warehouse.rollbacks += 1
+            self.warehouse.db.rollback()
+
+    def close(self):
+        # The warehouse stays open for the next script
+        pass
+
+
+def run_pipeline_script(relative_path, warehouse, s3):
+    """Import one loader / stage_to_dw script, point it at the stand-ins and time its main().
+
+    Returns (seconds, ok); a script that raised or rolled back its transaction is not ok.
+    """
+    module_name = re.sub(r'\W', '_', relative_path[:-len('.py')])
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(REPO_ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.connect_to_redshift = lambda *args: warehouse.connect()
+    if hasattr(module, 'boto3'):
+        module.boto3 = types.SimpleNamespace(client=lambda *args, **kwargs: s3)
+
+    rollbacks = warehouse.rollbacks
+    start_time = time.perf_counter()
+    try:
+        module.main()
+        ok = warehouse.rollbacks == rollbacks
+    except Exception as e:
+        print(f"{relative_path} failed: {e}")
+        ok = False
+    return time.perf_counter() - start_time, ok
+
+def hop_summary(warehouse):
+    """Sum etl_metadata.hop_metrics per batch, table and hop, in the order the hops ran."""
+    with warehouse.lock:
+        cursor = warehouse.db.execute("""
+            SELECT etl_batch_no, table_name, hop, SUM(row_count), SUM(byte_count), SUM(duration_seconds)
+            FROM etl_metadata.hop_metrics
+            GROUP BY etl_batch_no, table_name, hop
+            ORDER BY etl_batch_no, table_name, MIN(rowid)
+        """)
+        return [{'batch_no': batch_no, 'table': table_name, 'hop': hop, 'rows': rows, 'bytes': size, 'seconds': seconds}
+                for batch_no, table_name, hop, rows, size, seconds in cursor.fetchall()]
+
+def engine_settings():
+    """The extract settings this run used, saved alongside its timings."""
+    return {
+        'extract_format': extract_engine.extract_format,
+        'extract_compression': extract_engine.extract_compression,
+        'extract_partitions': extract_engine.extract_partitions,
+        'extract_incremental': extract_engine.extract_incremental,
+        'extract_snapshot': extract_engine.extract_snapshot,
+        'extract_sort': extract_engine.extract_sort,
+        'extract_source_mode': extract_engine.extract_source_mode,
+        'table_source_modes': extract_engine.table_source_modes,
+        'extract_fast_convert': extract_engine.extract_fast_convert,
+        'extract_checkpoint': extract_engine.extract_checkpoint,
+        'extract_table_workers': extract_engine.extract_table_workers,
+        'fetch_arraysize': extract_engine.fetch_arraysize,
+        's3_part_size': extract_engine.s3_part_size,
+    }
+
+def run_batch(batch_no, batch_date, table_names, warehouse, s3):
+    """Run the pipeline once for one batch; returns ({stage: seconds}, {script: result}, failures)."""
+    print(f"\n=== Batch {batch_no} ({batch_date}) ===")
+    warehouse.set_batch(batch_no, batch_date)
+    stages, scripts = {}, {}
+    start_time = time.perf_counter()
+    failures = extract_engine.run_exports('redshift', table_names)
+    stages['extract'] = time.perf_counter() - start_time
+
+    for stage, stage_scripts in (('truncate_stage', ['truncate_stage.py']), ('s3_to_stage', loader_scripts),
+                                 ('stage_to_dw', stage_to_dw_scripts)):
+        start_time = time.perf_counter()
+        for script in stage_scripts:
+            seconds, ok = run_pipeline_script(script, warehouse, s3)
+            scripts[script] = {'seconds': seconds, 'ok': ok}
+            failures += not ok
+        stages[stage] = time.perf_counter() - start_time
+    return stages, scripts, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1, help="Multiple of the classicmodels sample's row counts (default: 1)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the generated rows")
+    parser.add_argument('--as-of', type=datetime.date.fromisoformat, default=datetime.date(2005, 6, 9),
+                        help="Snapshot date; the first batch loads everything before it (default: 2005-06-09)")
+    parser.add_argument('--delta-days', type=int, default=0,
+                        help="After the initial load, apply this many daily deltas and run one incremental batch for each")
+    parser.add_argument('--tables', nargs='+', choices=list(tables), default=list(tables), help="Tables to export (default: all)")
+    parser.add_argument('--bucket', default='etl-benchmark')
+    parser.add_argument('--s3-endpoint-url', help="Use a local S3 emulator (e.g. MinIO) instead of the in-process stand-in")
+    parser.add_argument('--workdir', help="Keep the sqlite source and warehouse files here after the run (default: a temporary directory)")
+    parser.add_argument('--output', help="Also write the timings and settings to this JSON file")
+    args = parser.parse_args()
+    if extract_engine.extract_format == 'parquet':
+        parser.error("EXTRACT_FORMAT=parquet needs Oracle column types, which the sqlite source does not report")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='etl_benchmark_')
+    os.makedirs(workdir, exist_ok=True)
+    generator = ClassicModelsGenerator(args.scale, args.seed, as_of=args.as_of)
+    source_path = os.path.join(workdir, 'source.db')
+    if os.path.exists(source_path):
+        os.remove(source_path)
+
+    start_time = time.perf_counter()
+    source_rows = write_sqlite(source_path, generator.snapshot())
+    enable_change_capture(source_path)
+    seed_seconds = time.perf_counter() - start_time
+    print(f"Seeded {sum(source_rows.values()):,} source rows at scale {args.scale} in {seed_seconds:.2f}s: {source_rows}")
+
+    if args.s3_endpoint_url:
+        import boto3
+        s3 = boto3.client('s3', endpoint_url=args.s3_endpoint_url)
+    else:
+        s3 = LocalS3()
+    warehouse = Warehouse(workdir, s3)
+
+    # Point the engine at the stand-ins; existing pools mean the Oracle client is never loaded. Link and
+    # direct tables read the same file, the link suffix being dropped by oracle_to_sqlite()
+    extract_engine.s3_client = s3
+    extract_engine.bucket_name = args.bucket
+    extract_engine.session_pool = SourcePool(source_path, extract_engine.init_session)
+    extract_engine.direct_session_pool = SourcePool(source_path, extract_engine.init_session)
+    extract_engine.connect_to_redshift = warehouse.connect
+    os.environ['S3_BUCKET_NAME'] = args.bucket
+    extract_engine.create_bucket_if_not_exists(args.bucket)
+
+    # Batch 1 is the initial load; batch N + 1 extracts delta day N, dated the day its rows changed
+    batches = [{'batch_no': 1, 'batch_date': generator.history_start, 'source_rows': source_rows}]
+    failures = 0
+    for day in range(args.delta_days + 1):
+        batch = batches[-1]
+        if day:
+            delta_rows = generator.delta(day)
+            write_sqlite(source_path, delta_rows.items())
+            commit_source(source_path)
+            batch = {'batch_no': day + 1, 'batch_date': args.as_of + datetime.timedelta(days=day - 1),
+                     'source_rows': {table_name: len(rows) for table_name, rows in delta_rows.items()}}
+            batches.append(batch)
+        batch['stages'], batch['scripts'], batch_failures = run_batch(batch['batch_no'], batch['batch_date'], args.tables, warehouse, s3)
+        failures += batch_failures
+    extract_engine.report_pool_stats()
+
+    print(f"\nStage seconds per batch (scale {args.scale}, workdir {workdir})")
+    print(f"{'batch':<8} {'date':<11} {'rows':>10} " + " ".join(f"{stage:>14}" for stage in batches[0]['stages']))
+    for batch in batches:
+        print(f"{batch['batch_no']:<8} {str(batch['batch_date']):<11} {sum(batch['source_rows'].values()):>10,} "
+              + " ".join(f"{seconds:>14.2f}" for seconds in batch['stages'].values()))
+    print(f"\n{'script':<52} " + " ".join(f"{'batch ' + str(batch['batch_no']):>9}" for batch in batches))
+    for script in batches[0]['scripts']:
+        print(f"{script:<52} " + " ".join(
+            f"{batch['scripts'][script]['seconds']:>8.2f}{' ' if batch['scripts'][script]['ok'] else '!'}" for batch in batches))
+    if failures:
+        print("! marks a script that failed or rolled back")
+    hops = hop_summary(warehouse)
+    print(f"\n{'batch':<6} {'table':<26} {'hop':<14} {'rows':>10} {'bytes':>12} {'seconds':>8} {'rows/sec':>11}")
+    for hop in hops:
+        rows_per_sec = hop['rows'] / hop['seconds'] if hop['rows'] is not None and hop['seconds'] else None
+        print(f"{hop['batch_no']:<6} {hop['table']:<26} {hop['hop']:<14} {hop['rows'] if hop['rows'] is not None else '-':>10} "
+              f"{hop['bytes'] if hop['bytes'] is not None else '-':>12} {hop['seconds']:>8.3f} "
+              f"{f'{rows_per_sec:,.0f}' if rows_per_sec is not None else '-':>11}")
+    if isinstance(s3, LocalS3):
+        print(f"\n{s3.stored_bytes():,} bytes stored in the S3 stand-in")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'scale': args.scale, 'seed': args.seed, 'as_of': str(args.as_of), 'seed_seconds': seed_seconds,
+                       'settings': engine_settings(), 'batches': batches, 'hops': hops, 'failures': failures},
+                      output_file, indent=2, default=str)
+        print(f"Results written to {args.output}")
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Benchmark finished with {failures} failed step(s).")
+
+if __name__ == "__main__":
+    main()
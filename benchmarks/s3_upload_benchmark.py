@@ -0,0 +1,156 @@
+"""Measure S3 upload throughput for the exporter's multipart settings on 10 MB - 10 GB files.
+
+Every run streams generated bytes through extract_engine.S3MultipartWriter, the writer every
+extract uses, with --files uploads running at once like concurrent table exports sharing one
+client. It sweeps part size (S3_PART_SIZE_MB), multipart threshold (S3_MULTIPART_THRESHOLD_MB),
+parts in flight per file (S3_MAX_INFLIGHT_PARTS), the process-wide upload cap
+(S3_MAX_CONCURRENCY) and the client's connection pool (S3_MAX_POOL_CONNECTIONS).
+
+By default S3 is a stand-in that keeps only object sizes and charges every request a fixed
+latency plus transfer time. Each connection is limited to --connection-mb-per-sec, all of them
+share a --link-mb-per-sec link, and no more than the pool size are open at once. With
+--s3-endpoint-url the uploads go to a real S3 API (MinIO, LocalStack) instead.
+
+Run from the repository root:  python -m benchmarks.s3_upload_benchmark --sizes-mb 10 100 1000 10000 --files 4
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import extract_engine
+from benchmarks.local_pipeline_benchmark import LocalS3
+from extract_engine import S3MultipartWriter
+
+MB = 1024 * 1024
+
+
+class LatencyS3(LocalS3):
+    """LocalS3 that stores sizes instead of bytes and takes as long as a network upload would."""
+
+    def __init__(self, pool_connections, latency_ms, connection_mb_per_sec, link_mb_per_sec):
+        super().__init__()
+        self.connections = threading.BoundedSemaphore(pool_connections)
+        self.latency = latency_ms / 1000
+        self.connection_rate = connection_mb_per_sec * MB
+        self.link_rate = link_mb_per_sec * MB
+        self.link_free_at = 0.0
+        self.requests = 0
+
+    def _transfer(self, size):
+        # Requests beyond the pool size wait for a connection; bytes then queue for the shared link
+        with self.connections:
+            start_time = time.perf_counter()
+            with self.lock:
+                self.requests += 1
+                self.link_free_at = max(self.link_free_at, start_time) + size / self.link_rate
+                link_done = self.link_free_at
+            done = max(link_done, start_time + size / self.connection_rate) + self.latency
+            time.sleep(max(done - time.perf_counter(), 0))
+
+    def put_object(self, Bucket, Key, Body):
+        self._transfer(len(Body))
+        with self.lock:
+            self._objects(Bucket, 'PutObject')[Key] = len(Body)
+        return {}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._transfer(len(Body))
+        with self.lock:
+            self._upload(UploadId, 'UploadPart')['parts'][PartNumber] = len(Body)
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._transfer(0)
+        with self.lock:
+            parts = self._upload(UploadId, 'CompleteMultipartUpload')['parts']
+            self._objects(Bucket, 'CompleteMultipartUpload')[Key] = sum(
+                parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+            del self.uploads[UploadId]
+        return {}
+
+    def stored_bytes(self):
+        with self.lock:
+            return sum(size for objects in self.buckets.values() for size in objects.values())
+
+
+def upload_file(key, size, block, part_size, multipart_threshold, max_inflight):
+    """Stream `size` bytes of `block` repeats through one writer; returns the bytes written."""
+    with S3MultipartWriter(key, part_size=part_size, max_inflight=max_inflight,
+                           multipart_threshold=multipart_threshold) as upload:
+        remaining = size
+        while remaining:
+            chunk = block if remaining >= len(block) else block[:remaining]
+            upload.write(chunk)
+            remaining -= len(chunk)
+    return upload.bytes_written
+
+def run_setting(s3, size, files, block, part_size, multipart_threshold, max_inflight, max_concurrency):
+    """Upload `files` objects of `size` bytes at once; returns the wall time in seconds."""
+    extract_engine.s3_client = s3
+    extract_engine.s3_upload_slots = threading.BoundedSemaphore(max_concurrency)
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=files) as executor:
+        futures = [
+            executor.submit(upload_file, f"benchmarks/s3_upload/{size // MB}mb_{number}", size, block,
+                            part_size, multipart_threshold, max_inflight)
+            for number in range(files)
+        ]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start_time
+
+def make_client(args, pool_connections):
+    if args.s3_endpoint_url:
+        import boto3
+        return boto3.client('s3', endpoint_url=args.s3_endpoint_url,
+                            config=extract_engine.Config(max_pool_connections=pool_connections))
+    return LatencyS3(pool_connections, args.latency_ms, args.connection_mb_per_sec, args.link_mb_per_sec)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes-mb', nargs='+', type=int, default=[10, 100, 1000, 10000], help="File sizes to upload")
+    parser.add_argument('--files', type=int, default=4, help="Files uploaded at once, like concurrent table exports")
+    parser.add_argument('--part-sizes-mb', nargs='+', type=int, default=[8, 16, 64], help="S3_PART_SIZE_MB values (min 5)")
+    parser.add_argument('--thresholds-mb', nargs='+', type=int, default=[0],
+                        help="S3_MULTIPART_THRESHOLD_MB values; 0 means one part")
+    parser.add_argument('--inflight', nargs='+', type=int, default=[4], help="S3_MAX_INFLIGHT_PARTS values")
+    parser.add_argument('--max-concurrency', nargs='+', type=int, default=[4, 32], help="S3_MAX_CONCURRENCY values")
+    parser.add_argument('--pool-connections', nargs='+', type=int,
+                        help="S3_MAX_POOL_CONNECTIONS values (default: equal to each --max-concurrency, like the engine)")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Stand-in: fixed time per request")
+    parser.add_argument('--connection-mb-per-sec', type=float, default=80, help="Stand-in: throughput of one connection")
+    parser.add_argument('--link-mb-per-sec', type=float, default=1200, help="Stand-in: throughput shared by all connections")
+    parser.add_argument('--bucket', default='etl-s3-upload-benchmark')
+    parser.add_argument('--s3-endpoint-url', help="Upload to this S3 API instead of the stand-in")
+    args = parser.parse_args()
+
+    extract_engine.bucket_name = args.bucket
+    block = os.urandom(MB)
+    print(f"{'size MB':>8} {'part MB':>7} {'thresh MB':>9} {'inflight':>8} {'concur':>6} {'pool':>5} "
+          f"{'seconds':>8} {'MB/s':>8} {'requests':>8}")
+    # Thresholds below a part behave like one part, so such combinations would repeat a row
+    settings = dict.fromkeys(
+        (size_mb * MB, max(part_mb, 5) * MB, max(threshold_mb, part_mb, 5) * MB, inflight, concurrency)
+        for size_mb, part_mb, threshold_mb, inflight, concurrency in itertools.product(
+            args.sizes_mb, args.part_sizes_mb, args.thresholds_mb, args.inflight, args.max_concurrency)
+    )
+    for size, part_size, multipart_threshold, inflight, concurrency in settings:
+        size_mb = size // MB
+        for pool_connections in args.pool_connections or [concurrency]:
+            s3 = make_client(args, pool_connections)
+            if args.s3_endpoint_url:
+                extract_engine.s3_client = s3
+                extract_engine.create_bucket_if_not_exists(args.bucket)
+            else:
+                s3.create_bucket(Bucket=args.bucket)
+            seconds = run_setting(s3, size, args.files, block, part_size, multipart_threshold, inflight, concurrency)
+            throughput = size_mb * args.files / seconds if seconds > 0 else float('inf')
+            requests = getattr(s3, 'requests', '-')
+            print(f"{size_mb:>8,} {part_size // MB:>7} {multipart_threshold // MB:>9} {inflight:>8} {concurrency:>6} "
+                  f"{pool_connections:>5} {seconds:>8.2f} {throughput:>8.1f} {requests:>8}")
+
+if __name__ == "__main__":
+    main()
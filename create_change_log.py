@@ -0,0 +1,65 @@
+import os
+import oracledb
+from dotenv import load_dotenv
+
+from source_config import change_log_name, source_dsn, source_password, source_username, tables
+
+# Load environment variables
+load_dotenv()
+
+oracledb.init_oracle_client(lib_dir=os.getenv('d'))
+
+
+def create_change_log():
+    """Create one change log and trigger per exported table in the source schema (EXTRACT_INCREMENTAL=changelog).
+
+    Each log holds the table's primary key columns with their own types, so the exporter re-reads
+    exactly the changed rows. Deletes are logged too, but the exporter only reads rows that still
+    exist, so a deleted row stays in devdw.
+    """
+    try:
+        # Same login the exporter's direct mode uses: the source schema on SOURCE_DSN (default ORACLE_DSN)
+        connection = oracledb.connect(user=source_username, password=source_password, dsn=source_dsn)
+        with connection.cursor() as cursor:
+            for table_name, table in tables.items():
+                log_name = change_log_name(table_name)
+                keys = table['primary_key']
+                key_list = ', '.join(keys)
+                # The key columns are copied with their types; ROWDEPENDENCIES gives every log row
+                # its own commit SCN in ORA_ROWSCN
+                try:
+                    cursor.execute(f"""
+                        CREATE TABLE {log_name} ROWDEPENDENCIES AS
+                        SELECT {key_list}, CAST(NULL AS CHAR(1)) AS OPERATION, SYSTIMESTAMP AS CHANGED_AT
+                        FROM {table_name} WHERE 1 = 0
+                    """)
+                    print(f"Change log table '{log_name}' created.")
+                except oracledb.DatabaseError as e:
+                    print(f"Change log table '{log_name}' already exists or could not be created: {e}")
+
+                old_keys = ', '.join(f':OLD.{key}' for key in keys)
+                new_keys = ', '.join(f':NEW.{key}' for key in keys)
+                cursor.execute(f"""
+                    CREATE OR REPLACE TRIGGER {table_name}_CHANGE_LOG
+                    AFTER INSERT OR UPDATE OR DELETE ON {table_name}
+                    FOR EACH ROW
+                    BEGIN
+                        IF DELETING THEN
+                            INSERT INTO {log_name} ({key_list}, OPERATION, CHANGED_AT) VALUES ({old_keys}, 'D', SYSTIMESTAMP);
+                        ELSIF INSERTING THEN
+                            INSERT INTO {log_name} ({key_list}, OPERATION, CHANGED_AT) VALUES ({new_keys}, 'I', SYSTIMESTAMP);
+                        ELSE
+                            INSERT INTO {log_name} ({key_list}, OPERATION, CHANGED_AT) VALUES ({new_keys}, 'U', SYSTIMESTAMP);
+                        END IF;
+                    END;
+                """)
+                print(f"Trigger '{table_name}_CHANGE_LOG' logs changes to {table_name} by ({key_list}) in {log_name}.")
+
+    except oracledb.DatabaseError as e:
+        print("Error creating change log:", e)
+    finally:
+        if 'connection' in locals():
+            connection.close()
+
+# Run the function to create the change log
+create_change_log()
@@ -0,0 +1,90 @@
+"""Helpers shared by the extract engine, the S3 to stage loaders and the stage to DW scripts
+for the bookkeeping tables in Redshift's etl_metadata schema.
+
+Every function takes an open Redshift connection or cursor (redshift_connector or psycopg2)
+and leaves closing it to the caller.
+"""
+import hashlib
+import time
+
+
+def execute_timed(cursor, metrics, hop, query):
+    """Run one stage to DW statement and keep its (hop, rows affected, bytes, seconds) for record_hop_metrics."""
+    start_time = time.perf_counter()
+    cursor.execute(query)
+    metrics.append((hop, cursor.rowcount if cursor.rowcount >= 0 else None, None, time.perf_counter() - start_time))
+
+def record_hop_metrics(connection, batch_no, batch_date, table_name, metrics):
+    """Append (hop, rows, bytes, seconds) measurements to etl_metadata.hop_metrics; a failure never fails the load."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS etl_metadata.hop_metrics (
+                    etl_batch_no INTEGER,
+                    etl_batch_date DATE,
+                    table_name VARCHAR(128) NOT NULL,
+                    hop VARCHAR(32) NOT NULL,
+                    row_count BIGINT,
+                    byte_count BIGINT,
+                    duration_seconds DOUBLE PRECISION,
+                    rows_per_sec DOUBLE PRECISION,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            for hop, row_count, byte_count, seconds in metrics:
+                cursor.execute(
+                    "INSERT INTO etl_metadata.hop_metrics "
+                    "(etl_batch_no, etl_batch_date, table_name, hop, row_count, byte_count, duration_seconds, rows_per_sec) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    (batch_no, batch_date, table_name, hop, row_count, byte_count, seconds,
+                     row_count / seconds if row_count is not None and seconds > 0 else None)
+                )
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        print(f"Could not record hop metrics for {table_name}: {e}")
+
+def ensure_stage_load_table(cursor):
+    """Create etl_metadata.stage_load, the last extract each loader copied into its stage table."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_metadata.stage_load (
+            table_name VARCHAR(128) NOT NULL,
+            fingerprint VARCHAR(64) NOT NULL,
+            etl_batch_no INTEGER,
+            in_stage BOOLEAN NOT NULL,
+            merged BOOLEAN NOT NULL,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def extract_fingerprint(entry):
+    """Identify a run manifest entry's extract by the keys and sha256 hashes of its data files."""
+    files = sorted(f"{file['key']}:{file['sha256']}" for file in entry['files'])
+    return hashlib.sha256('\n'.join(files).encode()).hexdigest()
+
+def get_stage_load(cursor, table_name):
+    """Return (fingerprint, merged) for the extract last copied into the table's stage, or (None, False)."""
+    ensure_stage_load_table(cursor)
+    cursor.execute("SELECT fingerprint, merged FROM etl_metadata.stage_load WHERE table_name = %s", (table_name,))
+    row = cursor.fetchone()
+    return (row[0], bool(row[1])) if row else (None, False)
+
+def record_stage_load(cursor, table_name, batch_no, fingerprint):
+    """Remember the extract just copied into the stage, not yet merged; runs in the COPY's transaction."""
+    ensure_stage_load_table(cursor)
+    cursor.execute("DELETE FROM etl_metadata.stage_load WHERE table_name = %s", (table_name,))
+    cursor.execute(
+        "INSERT INTO etl_metadata.stage_load (table_name, fingerprint, etl_batch_no, in_stage, merged) "
+        "VALUES (%s, %s, %s, TRUE, FALSE)",
+        (table_name, fingerprint, batch_no)
+    )
+
+def clear_stage_loads(cursor):
+    """Note that the stage tables were truncated, so no recorded extract is in them any more."""
+    ensure_stage_load_table(cursor)
+    cursor.execute("UPDATE etl_metadata.stage_load SET in_stage = FALSE")
+
+def mark_stage_merged(cursor, table_name):
+    """Mark the extract held in the table's stage as merged into the DW; runs in the merge's transaction."""
+    ensure_stage_load_table(cursor)
+    cursor.execute("UPDATE etl_metadata.stage_load SET merged = TRUE WHERE table_name = %s AND in_stage", (table_name,))
@@ -0,0 +1,1528 @@
+import argparse
+import csv
+import datetime
+import decimal
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import oracledb
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+import etl_metadata
+from source_config import (
+    change_log_name, change_log_table, db_link_name, extract_source_mode, parse_table_source_modes, source_dsn,
+    source_modes, source_object, source_password, source_username, table_source_mode, table_source_modes, tables,
+    uses_db_link
+)
+
+# Load environment variables
+load_dotenv()
+
+# Initialize S3 client and parameters, shared by every table export in this process
+# Process-wide cap on part uploads and single-part puts running at once, across every table export
+s3_max_concurrency = int(os.getenv('S3_MAX_CONCURRENCY') or '32')
+# One client is shared by every export thread (boto3 clients are thread-safe); its connection pool
+# must cover S3_MAX_CONCURRENCY, or botocore opens and throws away extra connections
+s3_max_pool_connections = int(os.getenv('S3_MAX_POOL_CONNECTIONS') or s3_max_concurrency)
+s3_client = boto3.client(
+    's3', region_name=os.getenv('AWS_REGION'),
+    endpoint_url=os.getenv('S3_ENDPOINT_URL'),  # S3_ENDPOINT_URL points at a local S3 stand-in for testing
+    config=Config(max_pool_connections=s3_max_pool_connections)
+)
+bucket_name = os.getenv('S3_BUCKET_NAME')
+region = os.getenv('AWS_REGION')
+
+# Ensure the bucket exists
+def create_bucket_if_not_exists(bucket_name, region=None):
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+        print(f"Bucket '{bucket_name}' already exists.")
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code == '404':
+            print(f"Bucket '{bucket_name}' does not exist. Creating it...")
+            if region:
+                s3_client.create_bucket(
+                    Bucket=bucket_name,
+                    CreateBucketConfiguration={'LocationConstraint': region}
+                )
+            else:
+                s3_client.create_bucket(Bucket=bucket_name)
+            print(f"Bucket '{bucket_name}' created successfully.")
+        else:
+            print(f"Error checking bucket: {e}")
+            raise
+
+# Multipart upload settings (S3 requires every part but the last to be >= 5 MB). Files smaller than
+# the threshold (never less than one part) go up in a single put_object.
+s3_part_size = max(int(os.getenv('S3_PART_SIZE_MB') or '16'), 5) * 1024 * 1024
+s3_multipart_threshold = max(int(os.getenv('S3_MULTIPART_THRESHOLD_MB') or 0) * 1024 * 1024, s3_part_size)
+s3_max_inflight_parts = int(os.getenv('S3_MAX_INFLIGHT_PARTS') or '4')
+s3_upload_slots = threading.BoundedSemaphore(s3_max_concurrency)
+
+class S3MultipartWriter(io.RawIOBase):
+    """Binary stream that uploads everything written to it to S3, hashing the bytes as they pass.
+
+    Output smaller than `multipart_threshold` is sent with a single put_object; anything larger
+    becomes a multipart upload whose parts are sent on a background thread pool while the caller
+    keeps writing, with at most `max_inflight` parts buffered in memory at any time. Uploads from
+    every writer in the process share the s3_upload_slots limit.
+
+    If `previous_sha256` matches the SHA-256 of the finished stream, the object already in S3 is
+    left as it is: the put is skipped, or the multipart upload is aborted, and `skipped` is set.
+    """
+
+    def __init__(self, key, part_size=s3_part_size, max_inflight=s3_max_inflight_parts, previous_sha256=None,
+                 multipart_threshold=s3_multipart_threshold):
+        super().__init__()
+        self.key = key
+        self.part_size = part_size
+        self.multipart_threshold = multipart_threshold
+        self.previous_sha256 = previous_sha256
+        self.bytes_written = 0
+        self.sha256 = None
+        self.skipped = False
+        self.upload_seconds = 0.0
+        self._timing_lock = threading.Lock()
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._futures = []
+        self._upload_id = None
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight)
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def write(self, data):
+        self._buffer += data
+        self._hash.update(data)
+        self.bytes_written += len(data)
+        if self._upload_id is None and len(self._buffer) < self.multipart_threshold:
+            return len(data)
+        while len(self._buffer) >= self.part_size:
+            self._submit_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _submit_part(self, body):
+        if self._upload_id is None:
+            response = s3_client.create_multipart_upload(Bucket=bucket_name, Key=self.key)
+            self._upload_id = response['UploadId']
+        # Blocks once max_inflight parts are queued, which bounds memory use
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        self._futures.append(self._executor.submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number, body):
+        try:
+            with s3_upload_slots:
+                start_time = time.perf_counter()
+                response = s3_client.upload_part(
+                    Bucket=bucket_name, Key=self.key, UploadId=self._upload_id,
+                    PartNumber=part_number, Body=body
+                )
+                self._add_upload_time(start_time)
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self._slots.release()
+
+    def _add_upload_time(self, start_time):
+        # Parts upload on several threads; upload_seconds is their summed S3 time
+        with self._timing_lock:
+            self.upload_seconds += time.perf_counter() - start_time
+
+    def _digest(self):
+        return self._hash.hexdigest()
+
+    def close(self):
+        """Finish the upload, or skip it when the content matches `previous_sha256`."""
+        if self.closed:
+            return
+        self.sha256 = self._digest()
+        unchanged = self.previous_sha256 is not None and self.sha256 == self.previous_sha256
+        try:
+            if self._upload_id is None:
+                # Everything fit in one part: unchanged content costs no upload at all
+                if unchanged:
+                    self.skipped = True
+                else:
+                    with s3_upload_slots:
+                        start_time = time.perf_counter()
+                        s3_client.put_object(Bucket=bucket_name, Key=self.key, Body=bytes(self._buffer))
+                        self._add_upload_time(start_time)
+            elif unchanged:
+                self.skipped = True
+                self.abort()
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                start_time = time.perf_counter()
+                s3_client.complete_multipart_upload(
+                    Bucket=bucket_name, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+                self._add_upload_time(start_time)
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._buffer.clear()
+            self._executor.shutdown(wait=True)
+            super().close()
+
+    def abort(self):
+        """Discard the upload so no partial object or orphaned parts are left in S3."""
+        if self.closed:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=self.key, UploadId=self._upload_id)
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class CheckpointedS3Writer(S3MultipartWriter):
+    """S3MultipartWriter for EXTRACT_CHECKPOINT extracts that can be resumed after a failure.
+
+    Parts are cut only when the caller calls end_chunk() at a key boundary. Once a part is
+    uploaded, a checkpoint is written to S3 with the upload id, the parts done so far and the
+    last key they contain. A failed extract leaves the multipart upload open. The next run
+    passes that checkpoint back in and appends parts to the same upload. The content hash is
+    built from the per-part hashes, so parts uploaded before a failure never have to be read again.
+    """
+
+    def __init__(self, key, signature, checkpoint=None, **kwargs):
+        super().__init__(key, **kwargs)
+        self.checkpoint_key = checkpoint_path(key)
+        self.signature = signature
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._parts = list(checkpoint['parts']) if checkpoint else []
+        self._part_hashes = [part['sha256'] for part in self._parts]
+        if checkpoint:
+            self._upload_id = checkpoint['upload_id']
+            self.bytes_written = sum(part['size'] for part in self._parts)
+            for part in self._parts:
+                future = Future()
+                future.set_result({'PartNumber': part['PartNumber'], 'ETag': part['ETag']})
+                self._futures.append(future)
+
+    def write(self, data):
+        # Buffer only; parts are cut in end_chunk() so none splits a key's rows
+        self._buffer += data
+        self.bytes_written += len(data)
+        return len(data)
+
+    def part_ready(self):
+        return len(self._buffer) >= self.part_size
+
+    def end_chunk(self, last_key, rows, high_water_mark):
+        """Upload the buffer as one part that ends at `last_key` (`rows` rows written in total)."""
+        body = bytes(self._buffer)
+        self._buffer.clear()
+        self._part_hashes.append(hashlib.sha256(body).hexdigest())
+        with self._lock:
+            self._pending[len(self._futures) + 1] = {
+                'last_key': last_key, 'rows': rows, 'high_water_mark': high_water_mark,
+                'size': len(body), 'sha256': self._part_hashes[-1],
+            }
+        self._submit_part(body)
+
+    def _upload_part(self, part_number, body):
+        part = super()._upload_part(part_number, body)
+        with self._lock:
+            if part_number not in self._pending:
+                # The final part is sent by close(), which completes the upload
+                return part
+            self._pending[part_number].update(part)
+            # Parts finish out of order; only a gap-free run of parts is safe to resume after
+            done = len(self._parts)
+            while len(self._parts) + 1 in self._pending and 'ETag' in self._pending[len(self._parts) + 1]:
+                self._parts.append(self._pending.pop(len(self._parts) + 1))
+            if len(self._parts) == done:
+                # An earlier part is still in flight; it writes the checkpoint covering this one
+                return part
+            last = self._parts[-1]
+            checkpoint = {
+                'signature': self.signature, 'upload_id': self._upload_id, 'parts': self._parts,
+                'last_key': last['last_key'], 'rows': last['rows'], 'high_water_mark': last['high_water_mark'],
+            }
+            s3_client.put_object(
+                Bucket=bucket_name, Key=self.checkpoint_key,
+                Body=json.dumps(checkpoint, default=str).encode('utf-8')
+            )
+        return part
+
+    def _digest(self):
+        hashes = list(self._part_hashes)
+        if self._buffer:
+            hashes.append(hashlib.sha256(self._buffer).hexdigest())
+        return hashlib.sha256(''.join(hashes).encode('ascii')).hexdigest()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        # Finished (or skipped as unchanged): nothing left to resume
+        s3_client.delete_object(Bucket=bucket_name, Key=self.checkpoint_key)
+
+    def abort(self):
+        """Keep the upload and its checkpoint for the next run, unless the extract was skipped as unchanged."""
+        if self.closed:
+            return
+        if self.skipped:
+            super().abort()
+            return
+        # Let parts already in flight land so the checkpoint covers them
+        self._executor.shutdown(wait=True)
+        io.RawIOBase.close(self)
+
+
+un = os.getenv('ORACLE_USERNAME')
+userpwd = os.getenv('ORACLE_PASSWORD')
+connect_string = os.getenv('ORACLE_DSN')
+
+# SCN every read of this run is pinned to, per source mode; filled by capture_snapshot() under EXTRACT_SNAPSHOT
+snapshot_scns = {}
+
+def source_table(table_name, source_mode):
+    """Name `table_name` for a FROM clause, pinned to the run's snapshot SCN when one was captured."""
+    if source_mode in snapshot_scns:
+        return f"{source_object(table_name, source_mode)} AS OF SCN {snapshot_scns[source_mode]}"
+    return source_object(table_name, source_mode)
+
+# Rows fetched per round trip; prefetchrows defaults to arraysize + 1 so the
+# first fetchmany() after execute() needs no extra round trip
+fetch_arraysize = int(os.getenv('ORACLE_ARRAYSIZE') or '5000')
+fetch_prefetchrows = int(os.getenv('ORACLE_PREFETCHROWS') or str(fetch_arraysize + 1))
+
+# Per-table arraysize/prefetchrows picked by benchmarks/fetch_tuning_benchmark.py; a table's entry
+# (or the 'default' entry) takes precedence over the two settings above. Set empty to ignore the file.
+fetch_tuning_file = os.getenv('FETCH_TUNING_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fetch_tuning.json')
+
+def load_fetch_tuning(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as tuning_file:
+        return json.load(tuning_file)
+
+fetch_tuning = load_fetch_tuning(fetch_tuning_file)
+
+def table_fetch_sizes(table_name):
+    """Return the (arraysize, prefetchrows) to fetch `table_name` with."""
+    tuned = fetch_tuning.get(table_name) or fetch_tuning.get('default')
+    if tuned:
+        return tuned['arraysize'], tuned['prefetchrows']
+    return fetch_arraysize, fetch_prefetchrows
+
+# Output format: 'csv' (default) or 'parquet' (needs pyarrow; load with s3_to_dev(redshift) using the same setting)
+extract_format = (os.getenv('EXTRACT_FORMAT') or 'csv').lower()
+if extract_format not in ('csv', 'parquet'):
+    raise ValueError(f"Unsupported EXTRACT_FORMAT '{extract_format}'; expected 'csv' or 'parquet'.")
+parquet_compression = os.getenv('PARQUET_COMPRESSION') or 'snappy'
+parquet_row_group_rows = int(os.getenv('PARQUET_ROW_GROUP_ROWS') or '131072')
+
+# CSV compression: 'none' (default), 'gzip' or 'zstd' (needs zstandard); an empty or 0 level uses the codec default
+extract_compression = (os.getenv('EXTRACT_COMPRESSION') or 'none').lower()
+extract_compression_level = int(os.getenv('EXTRACT_COMPRESSION_LEVEL') or 0)
+compression_suffixes = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+if extract_compression not in compression_suffixes:
+    raise ValueError(f"Unsupported EXTRACT_COMPRESSION '{extract_compression}'; expected one of {', '.join(compression_suffixes)}.")
+if extract_format == 'parquet' and extract_compression != 'none':
+    raise ValueError("EXTRACT_COMPRESSION applies to CSV only; use PARQUET_COMPRESSION for Parquet extracts.")
+
+# Skip uploading (and loading) extracts whose content hash matches the previous run for the same batch date
+skip_unchanged = (os.getenv('SKIP_UNCHANGED') or '1').lower() in ('1', 'true', 'yes')
+
+# Fetch NUMBER/DATE/TIMESTAMP columns as pre-formatted ISO text for CSV extracts (Parquet stays typed)
+extract_fast_convert = (os.getenv('EXTRACT_FAST_CONVERT') or '0').lower() in ('1', 'true', 'yes')
+
+# LOB columns (CLOB/NCLOB/BLOB) no longer than LOB_INLINE_MAX (characters for CLOBs, bytes for BLOBs)
+# arrive inline with each fetch batch as str/bytes; longer values are fetched as locators and read
+# LOB_CHUNK_SIZE at a time. BLOBs are written to CSV as hex, which COPY loads into VARBYTE columns.
+lob_inline_max = int(os.getenv('LOB_INLINE_MAX') or str(64 * 1024))
+lob_chunk_size = int(os.getenv('LOB_CHUNK_SIZE') or str(1024 * 1024))
+
+# Fetch results as Apache Arrow batches (python-oracledb 3.x data frames + pyarrow) instead of tuples
+extract_arrow = (os.getenv('EXTRACT_ARROW') or '0').lower() in ('1', 'true', 'yes')
+
+# Read each extract in partition-key order and checkpoint after every uploaded part so a failed
+# run resumes from the last good part (CSV tuple fetches only)
+extract_checkpoint = (os.getenv('EXTRACT_CHECKPOINT') or '0').lower() in ('1', 'true', 'yes')
+if extract_checkpoint and (extract_format != 'csv' or extract_arrow):
+    raise ValueError("EXTRACT_CHECKPOINT supports CSV extracts fetched as tuples; unset EXTRACT_ARROW and use EXTRACT_FORMAT=csv.")
+
+# Order the rows of every extract file by the table's sort_key so COPY appends sorted blocks: 'none'
+# (default), 'oracle' (ORDER BY in the extract query) or 'client' (an external merge sort that spills
+# sorted runs of EXTRACT_SORT_RUN_ROWS rows to temporary files)
+extract_sort = (os.getenv('EXTRACT_SORT') or 'none').lower()
+sort_modes = ('none', 'oracle', 'client')
+if extract_sort not in sort_modes:
+    raise ValueError(f"Unsupported EXTRACT_SORT '{extract_sort}'; expected one of {', '.join(sort_modes)}.")
+if extract_sort == 'client' and extract_arrow:
+    raise ValueError("EXTRACT_SORT=client sorts tuple fetches; use EXTRACT_SORT=oracle with EXTRACT_ARROW.")
+extract_sort_run_rows = int(os.getenv('EXTRACT_SORT_RUN_ROWS') or '500000')
+
+# Number of key ranges (and concurrent Oracle sessions) to split each table into
+extract_partitions = int(os.getenv('EXTRACT_PARTITIONS') or '1')
+
+# Incremental filter: 'batch_date' (UPDATE_TIMESTAMP after the batch date), 'watermark'
+# (UPDATE_TIMESTAMP after the per-table high-water mark kept in etl_metadata.extract_watermark),
+# or source-side change capture: 'scn' (rows whose ORA_ROWSCN is above the last exported SCN) or
+# 'changelog' (keys logged per table by create_change_log.py's triggers, committed after that SCN).
+# The last exported SCN per table is kept in etl_metadata.extract_change_position; once it is
+# saved, changelog mode deletes the log entries it covers.
+extract_incremental = (os.getenv('EXTRACT_INCREMENTAL') or 'batch_date').lower()
+incremental_modes = ('batch_date', 'watermark', 'scn', 'changelog')
+if extract_incremental not in incremental_modes:
+    raise ValueError(f"Unsupported EXTRACT_INCREMENTAL '{extract_incremental}'; expected one of {', '.join(incremental_modes)}.")
+
+# Read every table AS OF one SCN captured when the run starts, so tables exported in parallel (and
+# the key ranges of one table) see the same committed state. The source's undo retention must
+# cover the whole run, or late reads fail with ORA-01555.
+extract_snapshot = (os.getenv('EXTRACT_SNAPSHOT') or '0').lower() in ('1', 'true', 'yes')
+
+# Number of tables exported at the same time
+extract_table_workers = int(os.getenv('EXTRACT_TABLE_WORKERS') or str(len(tables)))
+
+# Global cap on (table, batch) exports running at once during a --backfill
+backfill_max_workers = int(os.getenv('BACKFILL_MAX_WORKERS') or str(extract_table_workers))
+
+# Session pool sizing; the default max covers every export worker running every partition at once
+pool_min = int(os.getenv('ORACLE_POOL_MIN') or '1')
+pool_max = int(os.getenv('ORACLE_POOL_MAX') or str(max(extract_table_workers, backfill_max_workers) * extract_partitions))
+pool_increment = int(os.getenv('ORACLE_POOL_INCREMENT') or '1')
+
+# One session pool per source mode and process, created on first use and shared by every table
+# and batch; each pool is sized by the settings above
+session_pool = None
+direct_session_pool = None
+oracle_client_ready = False
+session_pool_lock = threading.Lock()
+pool_stats = {'acquires': 0, 'new_sessions': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+pool_stats_lock = threading.Lock()
+
+def init_session(connection, requested_tag):
+    # The pool calls this only the first time a freshly opened session is handed out
+    with pool_stats_lock:
+        pool_stats['new_sessions'] += 1
+    # ISO formats so values fetched as strings (EXTRACT_FAST_CONVERT) are COPY-ready as they arrive
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            ALTER SESSION SET
+                NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS'
+                NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS.FF6'
+                NLS_NUMERIC_CHARACTERS = '.,'
+        """)
+
+def create_session_pool(user, password, dsn):
+    """Open a session pool, initialising the thick client the first time; call with session_pool_lock held."""
+    global oracle_client_ready
+    if not oracle_client_ready:
+        oracledb.init_oracle_client(lib_dir=os.getenv('d'))
+        if extract_arrow and extract_format == 'parquet':
+            # Data frame fetches map scaled NUMBERs to decimal128 only with this default set
+            oracledb.defaults.fetch_decimals = True
+        oracle_client_ready = True
+    return oracledb.create_pool(
+        user=user, password=password, dsn=dsn,
+        min=pool_min, max=pool_max, increment=pool_increment,
+        session_callback=init_session
+    )
+
+def get_session_pool(source_mode='link'):
+    """Return the process-wide pool for `source_mode`, creating it on first use.
+
+    'link' sessions log in as ORACLE_USERNAME; 'direct' sessions log in to the source schema.
+    """
+    global session_pool, direct_session_pool
+    with session_pool_lock:
+        if source_mode == 'direct':
+            if direct_session_pool is None:
+                direct_session_pool = create_session_pool(source_username, source_password, source_dsn)
+            return direct_session_pool
+        if session_pool is None:
+            session_pool = create_session_pool(un, userpwd, connect_string)
+        return session_pool
+
+@contextmanager
+def acquire_session(source_mode='link'):
+    """Borrow a session from the `source_mode` pool, recording how long the caller waited for it."""
+    pool = get_session_pool(source_mode)
+    start_time = time.perf_counter()
+    connection = pool.acquire()
+    waited = time.perf_counter() - start_time
+    with pool_stats_lock:
+        pool_stats['acquires'] += 1
+        pool_stats['wait_seconds'] += waited
+        pool_stats['max_wait_seconds'] = max(pool_stats['max_wait_seconds'], waited)
+    try:
+        yield connection
+    finally:
+        pool.release(connection)
+
+def report_pool_stats():
+    """Print acquire wait and session reuse figures so the pool can be sized from real runs."""
+    with pool_stats_lock:
+        stats = dict(pool_stats)
+    if not stats['acquires']:
+        return
+    reused = stats['acquires'] - stats['new_sessions']
+    average_wait_ms = stats['wait_seconds'] / stats['acquires'] * 1000
+    print(f"Session pool (min={pool_min}, max={pool_max}, increment={pool_increment}): "
+          f"{stats['acquires']} acquires, {stats['new_sessions']} sessions opened, {reused} reused; "
+          f"acquire wait avg {average_wait_ms:.1f} ms, max {stats['max_wait_seconds'] * 1000:.1f} ms, "
+          f"total {stats['wait_seconds']:.2f}s.")
+
+def connect_to_redshift():
+    """Open a psycopg2 connection to Redshift for batch control and watermark bookkeeping."""
+    import psycopg2
+    return psycopg2.connect(
+        host=os.getenv('REDSHIFT_HOST'),
+        port=os.getenv('REDSHIFT_PORT'),
+        dbname=os.getenv('REDSHIFT_DB'),
+        user=os.getenv('REDSHIFT_USER'),
+        password=os.getenv('REDSHIFT_PASSWORD')
+    )
+
+# Retrieve batch information from Oracle (h24parva.batch_control) or Redshift (etl_metadata.batch_control)
+def get_batch_control_info(batch_source):
+    if batch_source == 'oracle':
+        with acquire_session() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT etl_batch_no, etl_batch_date FROM h24parva.batch_control ORDER BY etl_batch_date DESC")
+                return cursor.fetchall()
+
+    # Query to retrieve batch control info from Redshift
+    query = """
+        SELECT etl_batch_no, etl_batch_date
+        FROM etl_metadata.batch_control
+    """
+
+    conn = connect_to_redshift()
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        result = cursor.fetchall()
+
+    conn.close()
+    return result
+
+def get_watermarks():
+    """Return {table_name: max UPDATE_TIMESTAMP already exported} from etl_metadata.extract_watermark."""
+    conn = connect_to_redshift()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS etl_metadata.extract_watermark (
+                    table_name VARCHAR(128) NOT NULL,
+                    high_water_mark TIMESTAMP NOT NULL,
+                    etl_batch_no INTEGER,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("SELECT table_name, high_water_mark FROM etl_metadata.extract_watermark")
+            result = dict(cursor.fetchall())
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+def record_hop_metrics(batch_no, batch_date, table_name, metrics):
+    """Append (hop, rows, bytes, seconds) measurements to etl_metadata.hop_metrics.
+
+    Metrics are best effort: a failure is printed and never fails the export.
+    """
+    try:
+        conn = connect_to_redshift()
+    except Exception as e:
+        print(f"Could not record hop metrics for {table_name}: {e}")
+        return
+    try:
+        etl_metadata.record_hop_metrics(conn, batch_no, batch_date, table_name, metrics)
+    finally:
+        conn.close()
+
+def get_change_positions():
+    """Return {table_name: last source SCN exported} for the current change capture mode."""
+    conn = connect_to_redshift()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS etl_metadata.extract_change_position (
+                    table_name VARCHAR(128) NOT NULL,
+                    capture_mode VARCHAR(16) NOT NULL,
+                    change_position BIGINT NOT NULL,
+                    etl_batch_no INTEGER,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute(
+                "SELECT table_name, change_position FROM etl_metadata.extract_change_position WHERE capture_mode = %s",
+                (extract_incremental,)
+            )
+            result = dict(cursor.fetchall())
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+def save_change_position(table_name, change_position, batch_no):
+    """Record the source SCN `table_name` has been exported up to."""
+    conn = connect_to_redshift()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM etl_metadata.extract_change_position WHERE table_name = %s AND capture_mode = %s",
+                (table_name, extract_incremental)
+            )
+            cursor.execute(
+                "INSERT INTO etl_metadata.extract_change_position (table_name, capture_mode, change_position, etl_batch_no) "
+                "VALUES (%s, %s, %s, %s)",
+                (table_name, extract_incremental, change_position, batch_no)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def save_watermark(table_name, high_water_mark, batch_no):
+    """Record the highest UPDATE_TIMESTAMP exported for `table_name` once its files and manifest are in S3."""
+    conn = connect_to_redshift()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM etl_metadata.extract_watermark WHERE table_name = %s", (table_name,))
+            cursor.execute(
+                "INSERT INTO etl_metadata.extract_watermark (table_name, high_water_mark, etl_batch_no) VALUES (%s, %s, %s)",
+                (table_name, high_water_mark, batch_no)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def fetch_batches(cursor, rows):
+    """Yield the already-fetched first batch and then every remaining fetchmany() batch."""
+    while rows:
+        yield rows
+        rows = cursor.fetchmany()
+
+def track_high_water_mark(batches, column_index, marks):
+    """Pass batches through while keeping the largest value of one column in marks['high_water_mark']."""
+    for rows in batches:
+        batch_max = max((row[column_index] for row in rows if row[column_index] is not None), default=None)
+        if batch_max is not None and (marks['high_water_mark'] is None or batch_max > marks['high_water_mark']):
+            marks['high_water_mark'] = batch_max
+        yield rows
+
+def row_sort_key(description, positions):
+    """Key function ordering rows by the columns at `positions` as an ascending ORDER BY does in Oracle:
+    NULLs last, and NUMBERs fetched as text compared as numbers."""
+    numeric = [extract_fast_convert and description[position].type_code is oracledb.DB_TYPE_NUMBER for position in positions]
+    def key(row):
+        # (is NULL, value) pairs never compare None with a value
+        return tuple(
+            (True, None) if row[position] is None
+            else (False, decimal.Decimal(row[position]) if is_number else row[position])
+            for position, is_number in zip(positions, numeric)
+        )
+    return key
+
+def spill_run(rows, chunk_rows=10000):
+    """Write sorted rows to a temporary file in pickled chunks; returns the file, rewound."""
+    run_file = tempfile.TemporaryFile()
+    for start in range(0, len(rows), chunk_rows):
+        pickle.dump(rows[start:start + chunk_rows], run_file, pickle.HIGHEST_PROTOCOL)
+    run_file.seek(0)
+    return run_file
+
+def read_run(run_file):
+    while True:
+        try:
+            yield from pickle.load(run_file)
+        except EOFError:
+            return
+
+def external_sort(batches, key, batch_rows=None):
+    """Yield the rows of `batches` in `key` order, in batches of `batch_rows` (default ORACLE_ARRAYSIZE).
+
+    Runs of extract_sort_run_rows rows are sorted in memory and spilled to temporary files, which
+    are then merged, so memory stays bounded by one run however large the extract is.
+    """
+    batch_rows = batch_rows or fetch_arraysize
+    runs, pending = [], []
+    try:
+        for rows in batches:
+            pending.extend(rows)
+            if len(pending) >= extract_sort_run_rows:
+                pending.sort(key=key)
+                runs.append(spill_run(pending))
+                pending = []
+        pending.sort(key=key)
+        if runs:
+            if pending:
+                runs.append(spill_run(pending))
+                pending = []
+            merged = heapq.merge(*(read_run(run_file) for run_file in runs), key=key)
+        else:
+            merged = iter(pending)
+        while rows := list(itertools.islice(merged, batch_rows)):
+            yield rows
+    finally:
+        for run_file in runs:
+            run_file.close()
+
+def write_csv(columns, batches, upload):
+    """Encode every batch of rows as CSV into `upload`; returns the row count."""
+    outputfile = io.TextIOWrapper(upload, encoding='utf-8', newline='')
+    writer = csv.writer(outputfile, lineterminator="\n")
+    writer.writerow(columns)
+    row_count = 0
+    for rows in batches:
+        writer.writerows(rows)
+        row_count += len(rows)
+    outputfile.flush()
+    outputfile.detach()
+    return row_count
+
+def parquet_type(column):
+    """Map an Oracle column description to the Arrow type stored in the Parquet file."""
+    import pyarrow as pa
+    if column.type_code is oracledb.DB_TYPE_NUMBER:
+        if column.scale == 0 and 0 < column.precision <= 9:
+            return pa.int32()
+        if column.scale == 0 and 0 < column.precision <= 18:
+            return pa.int64()
+        if column.scale > 0 and column.precision <= 38:
+            return pa.decimal128(column.precision, column.scale)
+        return pa.float64()
+    if column.type_code in (oracledb.DB_TYPE_BINARY_DOUBLE, oracledb.DB_TYPE_BINARY_FLOAT):
+        return pa.float64()
+    if column.type_code in (oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP):
+        return pa.timestamp('us')
+    if column.type_code in (oracledb.DB_TYPE_RAW, oracledb.DB_TYPE_BLOB, oracledb.DB_TYPE_LONG_RAW):
+        return pa.binary()
+    return pa.string()
+
+def decimal_output_handler(cursor, metadata):
+    # Fetch scaled NUMBERs as Decimal so they land in Parquet DECIMAL columns without float rounding
+    if metadata.type_code is oracledb.DB_TYPE_NUMBER and metadata.scale > 0:
+        return cursor.var(decimal.Decimal, arraysize=cursor.arraysize)
+
+def csv_output_handler(cursor, metadata):
+    # Have the Oracle client hand back NUMBER/DATE/TIMESTAMP values as text, so no Decimal, float or
+    # datetime objects are built per value and csv.writer only has strings to join
+    if metadata.type_code in (oracledb.DB_TYPE_NUMBER, oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP):
+        return cursor.var(str, 64, arraysize=cursor.arraysize)
+
+# LOB column types and the LONG types that fetch them inline; locator columns carry this suffix
+lob_fetch_types = {
+    oracledb.DB_TYPE_CLOB: oracledb.DB_TYPE_LONG,
+    oracledb.DB_TYPE_NCLOB: oracledb.DB_TYPE_LONG_NVARCHAR,
+    oracledb.DB_TYPE_BLOB: oracledb.DB_TYPE_LONG_RAW,
+}
+lob_locator_suffix = '__LOCATOR'
+
+def lob_select_list(description):
+    """Build a select list that reads each LOB column of `description` in two parts.
+
+    The column itself holds values of up to lob_inline_max and is fetched inline; a locator column
+    appended after all the others holds the longer ones. Returns (select list, LOB column positions),
+    or (None, []) when there is no LOB column.
+    """
+    names = [column.name for column in description]
+    lob_positions = [position for position, column in enumerate(description) if column.type_code in lob_fetch_types]
+    if not lob_positions:
+        return None, []
+    select_list = [
+        f"CASE WHEN DBMS_LOB.GETLENGTH({name}) <= {lob_inline_max} THEN {name} END AS {name}"
+        if position in lob_positions else name
+        for position, name in enumerate(names)
+    ]
+    select_list += [
+        f"CASE WHEN DBMS_LOB.GETLENGTH({names[position]}) > {lob_inline_max} THEN {names[position]} END "
+        f"AS {names[position]}{lob_locator_suffix}"
+        for position in lob_positions
+    ]
+    return ', '.join(select_list), lob_positions
+
+def lob_output_handler(base_handler=None):
+    """Output type handler that fetches LOB columns from lob_select_list() inline, deferring to `base_handler` otherwise."""
+    def handler(cursor, metadata):
+        if metadata.type_code in lob_fetch_types and not metadata.name.endswith(lob_locator_suffix):
+            return cursor.var(lob_fetch_types[metadata.type_code], arraysize=cursor.arraysize)
+        if base_handler is not None:
+            return base_handler(cursor, metadata)
+    return handler
+
+def read_lob(lob):
+    """Read a whole LOB through its locator, lob_chunk_size at a time."""
+    chunks, offset = [], 1
+    while True:
+        chunk = lob.read(offset, lob_chunk_size)
+        if not chunk:
+            return (b'' if isinstance(chunk, bytes) else '').join(chunks)
+        chunks.append(chunk)
+        offset += len(chunk)
+
+def merge_lob_columns(batches, lob_positions, resolve_locators=False, hex_blobs=False):
+    """Fold the locator columns of lob_select_list() rows back into their LOB columns.
+
+    Long values stay LOB locators for write_csv_lobs() to stream, unless `resolve_locators` reads
+    them in full (Parquet, task3 --diff); `hex_blobs` turns BLOB bytes, inline or read in full, into
+    hex text for CSV.
+    """
+    width = len(lob_positions)
+    for rows in batches:
+        merged = []
+        for row in rows:
+            values = list(row[:-width])
+            for position, locator in zip(lob_positions, row[-width:]):
+                if locator is not None:
+                    values[position] = read_lob(locator) if resolve_locators else locator
+                if hex_blobs and isinstance(values[position], bytes):
+                    values[position] = values[position].hex()
+            merged.append(values)
+        yield merged
+
+def stream_lob(outputfile, lob):
+    """Write one LOB locator's value as a CSV field, lob_chunk_size at a time; BLOBs are written as hex."""
+    if lob.type is oracledb.DB_TYPE_BLOB:
+        offset = 1
+        while chunk := lob.read(offset, lob_chunk_size):
+            outputfile.write(chunk.hex())
+            offset += len(chunk)
+        return
+    outputfile.write('"')
+    offset = 1
+    while chunk := lob.read(offset, lob_chunk_size):
+        outputfile.write(chunk.replace('"', '""'))
+        offset += len(chunk)
+    outputfile.write('"')
+
+def write_csv_lobs(columns, batches, upload, lob_positions):
+    """write_csv for merge_lob_columns() rows: fields still held as LOB locators are streamed into the
+    file rather than read whole, so a row's longest value never has to fit in memory."""
+    outputfile = io.TextIOWrapper(upload, encoding='utf-8', newline='')
+    writer = csv.writer(outputfile, lineterminator="\n")
+    field_writer = csv.writer(outputfile, lineterminator="")
+    writer.writerow(columns)
+    row_count = 0
+    for rows in batches:
+        for row in rows:
+            if not any(isinstance(row[position], oracledb.LOB) for position in lob_positions):
+                writer.writerow(row)
+                continue
+            for position, value in enumerate(row):
+                if position:
+                    outputfile.write(',')
+                if isinstance(value, oracledb.LOB):
+                    stream_lob(outputfile, value)
+                elif value is not None and value != '':
+                    field_writer.writerow([value])
+            outputfile.write('\n')
+        row_count += len(rows)
+    outputfile.flush()
+    outputfile.detach()
+    return row_count
+
+def write_parquet(description, batches, upload):
+    """Write every batch of rows into `upload` as typed, compressed Parquet row groups; returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([pa.field(column.name, parquet_type(column)) for column in description])
+
+    def write_row_group(rows):
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        parquet_writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    row_count = 0
+    pending = []
+    with pq.ParquetWriter(upload, schema, compression=parquet_compression) as parquet_writer:
+        for rows in batches:
+            pending.extend(rows)
+            row_count += len(rows)
+            # Buffer fetches into full row groups so COPY reads fewer, larger column chunks
+            if len(pending) >= parquet_row_group_rows:
+                write_row_group(pending)
+                pending = []
+        if pending:
+            write_row_group(pending)
+    return row_count
+
+def compressed_stream(upload):
+    """Wrap `upload` in the configured compressor; the caller must close the returned stream first."""
+    if extract_compression == 'gzip':
+        # mtime=0 keeps the gzip header, and so the content hash, identical for identical data
+        return gzip.GzipFile(fileobj=upload, mode='wb', compresslevel=extract_compression_level or 6, mtime=0)
+    if extract_compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=extract_compression_level or 3).stream_writer(upload, closefd=False)
+    return upload
+
+def write_copy_manifest(manifest_path, files):
+    """Write a Redshift COPY manifest listing each uploaded (s3 key, byte size) pair."""
+    manifest = {
+        'entries': [
+            {'url': f"s3://{bucket_name}/{key}", 'mandatory': True, 'meta': {'content_length': size}}
+            for key, size in files
+        ]
+    }
+    s3_client.put_object(Bucket=bucket_name, Key=manifest_path, Body=json.dumps(manifest, indent=2).encode('utf-8'))
+
+def checkpoint_path(s3_path):
+    return f"checkpoints/{s3_path}.json"
+
+def read_checkpoint(s3_path, signature):
+    """Return the resumable checkpoint for `s3_path`, or None to start from scratch.
+
+    A checkpoint left by a different query (another batch, watermark or setting) or whose
+    multipart upload no longer exists is discarded.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=checkpoint_path(s3_path))
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    checkpoint = json.loads(response['Body'].read())
+    try:
+        if checkpoint['signature'] != signature:
+            print(f"Discarding checkpoint for {s3_path}: it was written for a different extract query.")
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=s3_path, UploadId=checkpoint['upload_id'])
+            checkpoint = None
+        else:
+            s3_client.list_parts(Bucket=bucket_name, Key=s3_path, UploadId=checkpoint['upload_id'])
+    except ClientError as e:
+        print(f"Discarding checkpoint for {s3_path}: {e}")
+        checkpoint = None
+    if checkpoint is None:
+        s3_client.delete_object(Bucket=bucket_name, Key=checkpoint_path(s3_path))
+    return checkpoint
+
+def write_csv_checkpointed(columns, batches, upload, key_index, marks, checkpoint=None):
+    """write_csv for CheckpointedS3Writer: returns the total row count, including rows from `checkpoint`.
+
+    All rows for one key go into the same part, so a resumed read can restart at `key > last_key`.
+    When compression is on, each part is compressed separately. Gzip members and zstd frames
+    can be concatenated, so the finished object is still one valid stream.
+    """
+    def open_chunk():
+        output = compressed_stream(upload)
+        outputfile = io.TextIOWrapper(output, encoding='utf-8', newline='')
+        return output, outputfile, csv.writer(outputfile, lineterminator="\n")
+
+    def close_chunk(output, outputfile):
+        outputfile.flush()
+        outputfile.detach()
+        if output is not upload:
+            output.close()
+
+    output, outputfile, writer = open_chunk()
+    row_count = checkpoint['rows'] if checkpoint else 0
+    if not checkpoint:
+        writer.writerow(columns)
+    carry = []
+    for rows in batches:
+        rows = carry + rows
+        # Hold back the rows of the batch's last key; the next batch may continue that key
+        split = len(rows)
+        while split > 0 and rows[split - 1][key_index] == rows[-1][key_index]:
+            split -= 1
+        writer.writerows(rows[:split])
+        row_count += split
+        carry = rows[split:]
+        if split:
+            outputfile.flush()
+            if upload.part_ready():
+                close_chunk(output, outputfile)
+                upload.end_chunk(rows[split - 1][key_index], row_count, marks['high_water_mark'])
+                output, outputfile, writer = open_chunk()
+    writer.writerows(carry)
+    row_count += len(carry)
+    close_chunk(output, outputfile)
+    return row_count
+
+def restore_high_water_mark(value):
+    """Turn a checkpointed high-water mark back into the type the fetch returns."""
+    if value is None or extract_fast_convert:
+        return value
+    return datetime.datetime.fromisoformat(value)
+
+def get_partition_bounds(table_name, key, where_clause, params, partitions):
+    """Split the rows matching `where_clause` into `partitions` key ranges of about equal size.
+
+    Returns the inclusive upper bound of every range except the last, which is open-ended.
+    """
+    source_mode = table_source_mode(table_name)
+    sql_query = f"""
+        SELECT MAX({key})
+        FROM (
+            SELECT {key}, NTILE({partitions}) OVER (ORDER BY {key}) AS bucket
+            FROM {source_table(table_name, source_mode)}
+            WHERE {where_clause}
+        )
+        GROUP BY bucket
+        ORDER BY bucket
+    """
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(sql_query, params)
+            bounds = [row[0] for row in cursor.fetchall()]
+    # Repeated keys (e.g. ORDERNUMBER in ORDERDETAILS) can end two buckets on the same value
+    return sorted(set(bounds[:-1]))
+
+def fetch_arrow_batches(connection, sql_query, params, batch_size):
+    """Yield the query result as pyarrow Tables straight from python-oracledb's data frame fetch."""
+    import pyarrow as pa
+    for data_frame in connection.fetch_df_batches(statement=sql_query, parameters=params, size=batch_size):
+        yield pa.table(data_frame)
+
+def write_arrow_csv(table_batches, output):
+    """Encode Arrow batches as CSV (header included) with pyarrow's C++ writer; returns the row count."""
+    import pyarrow.csv as pa_csv
+    row_count = 0
+    csv_writer = None
+    for table in table_batches:
+        if csv_writer is None:
+            csv_writer = pa_csv.CSVWriter(output, table.schema)
+        csv_writer.write_table(table)
+        row_count += table.num_rows
+    if csv_writer is not None:
+        csv_writer.close()
+    return row_count
+
+def write_arrow_parquet(table_batches, upload):
+    """Write Arrow batches to `upload` as Parquet, one row group per fetched batch; returns the row count."""
+    import pyarrow.parquet as pq
+    row_count = 0
+    parquet_writer = None
+    for table in table_batches:
+        if parquet_writer is None:
+            parquet_writer = pq.ParquetWriter(upload, table.schema, compression=parquet_compression)
+        parquet_writer.write_table(table)
+        row_count += table.num_rows
+    if parquet_writer is not None:
+        parquet_writer.close()
+    return row_count
+
+def track_arrow_high_water_mark(table_batches, column_name, marks):
+    """Arrow counterpart of track_high_water_mark, computed column-wise with pyarrow.compute."""
+    import pyarrow.compute as pc
+    for table in table_batches:
+        batch_max = pc.max(table[column_name]).as_py()
+        if batch_max is not None and (marks['high_water_mark'] is None or batch_max > marks['high_water_mark']):
+            marks['high_water_mark'] = batch_max
+        yield table
+
+def export_query_arrow(sql_query, params, s3_path, previous_sha256=None, fetch_sizes=None, source_mode='link'):
+    """EXTRACT_ARROW variant of export_query: no per-row Python tuples between Oracle and the writer."""
+    arraysize, _ = fetch_sizes or (fetch_arraysize, fetch_prefetchrows)
+    with acquire_session(source_mode) as connection:
+        batch_size = parquet_row_group_rows if extract_format == 'parquet' else arraysize
+        timings = {'fetch_seconds': 0.0}
+        table_batches = timed_batches(fetch_arrow_batches(connection, sql_query, params, batch_size), timings)
+        first_table = next((table for table in table_batches if table.num_rows), None)
+        if first_table is None:
+            return None
+
+        marks = {'high_water_mark': None}
+        table_batches = track_arrow_high_water_mark(itertools.chain([first_table], table_batches), 'UPDATE_TIMESTAMP', marks)
+
+        # Stream the extract straight into S3; parts upload while we keep fetching
+        with S3MultipartWriter(s3_path, previous_sha256=previous_sha256) as upload:
+            write_start, fetched = time.perf_counter(), timings['fetch_seconds']
+            if extract_format == 'parquet':
+                row_count = write_arrow_parquet(table_batches, upload)
+            else:
+                output = compressed_stream(upload)
+                row_count = write_arrow_csv(table_batches, output)
+                if output is not upload:
+                    output.close()
+            timings['write_seconds'] = time.perf_counter() - write_start - (timings['fetch_seconds'] - fetched)
+        return file_result(s3_path, row_count, upload, marks['high_water_mark'], timings)
+
+def timed_batches(batches, timings):
+    """Pass batches through while adding the time spent fetching them to timings['fetch_seconds']."""
+    batches = iter(batches)
+    while True:
+        start_time = time.perf_counter()
+        batch = next(batches, None)
+        timings['fetch_seconds'] += time.perf_counter() - start_time
+        if batch is None:
+            return
+        yield batch
+
+def file_result(s3_path, row_count, upload, high_water_mark, timings):
+    """Describe one finished extract file for the COPY manifest, the run manifest, the watermark
+    and the hop metrics (Oracle fetch, file write and S3 upload seconds)."""
+    return {
+        'fetch_seconds': timings['fetch_seconds'],
+        'write_seconds': timings['write_seconds'],
+        'upload_seconds': upload.upload_seconds,
+        'key': s3_path,
+        'rows': row_count,
+        'bytes': upload.bytes_written,
+        'sha256': upload.sha256,
+        'uploaded': not upload.skipped,
+        'high_water_mark': high_water_mark,
+    }
+
+def export_query_checkpointed(sql_query, params, columns, s3_path, order_key, previous_sha256=None, fetch_sizes=None,
+                              source_mode='link', sort_key=None):
+    """EXTRACT_CHECKPOINT variant of export_query: reads rows in `order_key` order and continues
+    after the last checkpointed key when an earlier run of the same query failed part way.
+
+    A `sort_key` that starts with `order_key` orders the rows further, in Oracle whatever EXTRACT_SORT says.
+    """
+    signature = hashlib.sha256(
+        json.dumps([sql_query, params, extract_compression, extract_fast_convert], sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    checkpoint = read_checkpoint(s3_path, signature)
+    query_params = dict(params)
+    if checkpoint:
+        sql_query += f" AND {order_key} > :resume_key"
+        query_params['resume_key'] = checkpoint['last_key']
+        print(f"Resuming {s3_path} after {order_key} {checkpoint['last_key']} "
+              f"({checkpoint['rows']} rows in {len(checkpoint['parts'])} part(s) already uploaded)")
+    order_by = sort_key if sort_key and sort_key[0] == order_key else [order_key]
+    sql_query += f" ORDER BY {', '.join(order_by)}"
+
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            cursor.arraysize, cursor.prefetchrows = fetch_sizes or (fetch_arraysize, fetch_prefetchrows)
+            if extract_fast_convert:
+                cursor.outputtypehandler = csv_output_handler
+
+            start_time = time.perf_counter()
+            cursor.execute(sql_query, query_params)
+            rows = cursor.fetchmany()
+            if not rows and not checkpoint:
+                return None
+            timings = {'fetch_seconds': time.perf_counter() - start_time}
+
+            marks = {'high_water_mark': restore_high_water_mark(checkpoint['high_water_mark']) if checkpoint else None}
+            batches = track_high_water_mark(timed_batches(fetch_batches(cursor, rows), timings), columns.index('UPDATE_TIMESTAMP'), marks)
+
+            with CheckpointedS3Writer(s3_path, signature, checkpoint, previous_sha256=previous_sha256) as upload:
+                write_start, fetched = time.perf_counter(), timings['fetch_seconds']
+                row_count = write_csv_checkpointed(columns, batches, upload, columns.index(order_key), marks, checkpoint)
+                timings['write_seconds'] = time.perf_counter() - write_start - (timings['fetch_seconds'] - fetched)
+            return file_result(s3_path, row_count, upload, marks['high_water_mark'], timings)
+
+def export_query(sql_query, params, columns, s3_path, previous_sha256=None, fetch_sizes=None, source_mode='link',
+                 sort_key=None):
+    """Run one extract query on a `source_mode` pooled session and stream the result to `s3_path`.
+
+    Returns a file_result() dict, or None if the query returned no rows. When the content hash
+    equals `previous_sha256` the object already in S3 is kept and nothing new is stored. Rows are
+    written in `sort_key` order, sorted as EXTRACT_SORT says, when one is given.
+    """
+    if sort_key and extract_sort == 'oracle':
+        sql_query += f" ORDER BY {', '.join(sort_key)}"
+    if extract_arrow:
+        return export_query_arrow(sql_query, params, s3_path, previous_sha256, fetch_sizes, source_mode)
+
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            # Fetch in batches so memory stays flat regardless of the delta size
+            cursor.arraysize, cursor.prefetchrows = fetch_sizes or (fetch_arraysize, fetch_prefetchrows)
+            if extract_format == 'parquet':
+                cursor.outputtypehandler = decimal_output_handler
+            elif extract_fast_convert:
+                cursor.outputtypehandler = csv_output_handler
+
+            # Execute query
+            start_time = time.perf_counter()
+            cursor.execute(sql_query, params)
+            rows = cursor.fetchmany()
+            if not rows:
+                return None
+            timings = {'fetch_seconds': time.perf_counter() - start_time}
+
+            marks = {'high_water_mark': None}
+            batches = track_high_water_mark(timed_batches(fetch_batches(cursor, rows), timings), columns.index('UPDATE_TIMESTAMP'), marks)
+            if sort_key and extract_sort == 'client':
+                batches = external_sort(batches, row_sort_key(cursor.description, [columns.index(column) for column in sort_key]))
+
+            # Stream the extract straight into S3; parts upload while we keep fetching
+            with S3MultipartWriter(s3_path, previous_sha256=previous_sha256) as upload:
+                write_start, fetched = time.perf_counter(), timings['fetch_seconds']
+                if extract_format == 'parquet':
+                    row_count = write_parquet(cursor.description, batches, upload)
+                else:
+                    output = compressed_stream(upload)
+                    row_count = write_csv(columns, batches, output)
+                    if output is not upload:
+                        output.close()
+                timings['write_seconds'] = time.perf_counter() - write_start - (timings['fetch_seconds'] - fetched)
+            return file_result(s3_path, row_count, upload, marks['high_water_mark'], timings)
+
+def export_table(table_name, batch_no, batch_date, high_water_mark=None, window_end=None, previous_entry=None,
+                 change_filter=None):
+    """Export one table for one batch and return its run manifest entry.
+
+    The entry holds the total row count, each file's rows/bytes/sha256 and whether anything
+    differs from `previous_entry` (the table's entry in the last run manifest for this date).
+    `change_filter` is a (where clause, binds) pair from change_capture_filter() that replaces
+    the UPDATE_TIMESTAMP predicate.
+    """
+    columns = tables[table_name]['columns']
+    # Format date path for S3
+    date_path = batch_date.strftime('%Y-%m-%d')
+    file_suffix = f"{extract_format}{compression_suffixes[extract_compression]}"
+    manifest_path = f"{table_name.lower()}/{date_path}/{table_name}.manifest"
+    previous_hashes = {}
+    if skip_unchanged and previous_entry:
+        previous_hashes = {entry['key']: entry['sha256'] for entry in previous_entry['files']}
+
+    # Read only rows above the table's watermark when one is recorded, else everything after the batch date
+    if change_filter is not None:
+        where_clause, where_params = change_filter
+    elif high_water_mark is not None:
+        where_clause = "UPDATE_TIMESTAMP > :high_water_mark"
+        where_params = {'high_water_mark': high_water_mark}
+    else:
+        where_clause = f"UPDATE_TIMESTAMP > TO_TIMESTAMP('{batch_date.strftime('%Y-%m-%d')}', 'YYYY-MM-DD')"
+        where_params = {}
+    # Backfills close each batch's window at the next batch date so windows never overlap
+    if window_end is not None:
+        where_clause += f" AND UPDATE_TIMESTAMP <= TO_TIMESTAMP('{window_end.strftime('%Y-%m-%d')}', 'YYYY-MM-DD')"
+    source_mode = table_source_mode(table_name)
+    sql_query = f"""
+        SELECT {', '.join(columns)}
+        FROM {source_table(table_name, source_mode)}
+        WHERE {where_clause}
+    """
+
+    # Build one (query, binds, s3 key) job per key range, or a single job for the whole table
+    key = tables[table_name].get('partition_key')
+    if extract_partitions > 1 and key:
+        bounds = get_partition_bounds(table_name, key, where_clause, where_params, extract_partitions)
+        jobs = []
+        for part in range(len(bounds) + 1):
+            predicates, params = [], dict(where_params)
+            if part > 0:
+                predicates.append(f"{key} > :lower_bound")
+                params['lower_bound'] = bounds[part - 1]
+            if part < len(bounds):
+                predicates.append(f"{key} <= :upper_bound")
+                params['upper_bound'] = bounds[part]
+            part_query = sql_query + "".join(f" AND {predicate}" for predicate in predicates)
+            jobs.append((part_query, params, f"{table_name.lower()}/{date_path}/{table_name}_part{part:03d}.{file_suffix}"))
+    else:
+        jobs = [(sql_query, where_params, f"{table_name.lower()}/{date_path}/{table_name}.{file_suffix}")]
+
+    fetch_sizes = table_fetch_sizes(table_name)
+    sort_key = tables[table_name].get('sort_key') if extract_sort != 'none' else None
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = {}
+        for query, params, s3_path in jobs:
+            if extract_checkpoint and key:
+                future = executor.submit(export_query_checkpointed, query, params, columns, s3_path, key,
+                                         previous_hashes.get(s3_path), fetch_sizes, source_mode, sort_key)
+            else:
+                future = executor.submit(export_query, query, params, columns, s3_path, previous_hashes.get(s3_path),
+                                         fetch_sizes, source_mode, sort_key)
+            futures[future] = s3_path
+        results = {futures[future]: future.result() for future in as_completed(futures)}
+    elapsed = time.perf_counter() - start_time
+
+    # Keep part order stable in the manifest and skip ranges that came back empty
+    files = [results[s3_path] for _, _, s3_path in jobs if results[s3_path]]
+    if not files:
+        print(f"No data to export for table '{table_name}' on batch date '{batch_date}'. Skipping file creation.")
+        return {'rows': 0, 'changed': False, 'files': [], 'high_water_mark': None}
+
+    row_count = sum(file['rows'] for file in files)
+    rows_per_sec = row_count / elapsed if elapsed > 0 else float(row_count)
+    print(f"{table_name} exported {row_count} rows in {len(files)} file(s) in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec).")
+    for file in files:
+        action = "Uploaded" if file['uploaded'] else "Unchanged, kept existing"
+        print(f"{action} {file['rows']} rows ({file['bytes']} bytes, sha256 {file['sha256'][:12]}) at {file['key']}")
+
+    uploaded = [file for file in files if file['uploaded']]
+    record_hop_metrics(batch_no, batch_date, table_name, [
+        ('oracle_fetch', row_count, None, sum(file['fetch_seconds'] for file in files)),
+        ('file_write', row_count, sum(file['bytes'] for file in files), sum(file['write_seconds'] for file in files)),
+        ('s3_upload', sum(file['rows'] for file in uploaded), sum(file['bytes'] for file in uploaded),
+         sum(file['upload_seconds'] for file in files)),
+    ])
+
+    # Unchanged only if every file matched and the file set is the same as last time
+    changed = any(file['uploaded'] for file in files) or set(previous_hashes) != {file['key'] for file in files}
+    if changed:
+        write_copy_manifest(manifest_path, [(file['key'], file['bytes']) for file in files])
+        print(f"COPY manifest written to S3 at {manifest_path}")
+    else:
+        print(f"{table_name} extract is identical to the one already in S3; COPY manifest left as is.")
+
+    return {
+        'rows': row_count,
+        'changed': changed,
+        'files': [{name: file[name] for name in ('key', 'rows', 'bytes', 'sha256')} for file in files],
+        # The new watermark is the newest row actually written, not the time the query ran
+        'high_water_mark': max((file['high_water_mark'] for file in files if file['high_water_mark'] is not None), default=None),
+    }
+
+def get_current_scn(source_mode='link'):
+    """Read the source database's current SCN to extract up to."""
+    with acquire_session(source_mode) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {source_object('DBMS_FLASHBACK.GET_SYSTEM_CHANGE_NUMBER', source_mode)} FROM dual")
+            return cursor.fetchone()[0]
+
+def change_capture_filter(table_name, from_position, to_position):
+    """Build the (where clause, binds) that selects rows changed in (from_position, to_position]."""
+    params = {'from_position': from_position, 'to_position': to_position}
+    if extract_incremental == 'scn':
+        # ORA_ROWSCN is tracked per block unless the table has ROWDEPENDENCIES, so unchanged
+        # neighbours of a changed row may be re-read; the stage load tolerates duplicates
+        return "ORA_ROWSCN > :from_position AND ORA_ROWSCN <= :to_position", params
+    # Only the logged keys are read from the base table, via its primary key index. Each log is created
+    # with ROWDEPENDENCIES, so its ORA_ROWSCN is each entry's commit SCN: an entry whose transaction
+    # commits after a later one is not skipped. Logged deletes match no row and are not exported.
+    keys = ', '.join(tables[table_name]['primary_key'])
+    where_clause = f"""({keys}) IN (
+            SELECT {keys} FROM {source_object(change_log_name(table_name), table_source_mode(table_name))}
+            WHERE ORA_ROWSCN > :from_position AND ORA_ROWSCN <= :to_position
+        )"""
+    return where_clause, params
+
+def export_table_changes(table_name, batch_no, batch_date, positions, previous_entry=None):
+    """Export the rows changed since the table's stored SCN, then advance it to the SCN read up to."""
+    from_position = positions.get(table_name)
+    # Capture the upper bound first; changes committed while we read are picked up next run. Under
+    # EXTRACT_SNAPSHOT the bound is the SCN the table is read at.
+    source_mode = table_source_mode(table_name)
+    to_position = snapshot_scns.get(source_mode) or get_current_scn(source_mode)
+    change_filter = None
+    if from_position is None:
+        print(f"No SCN stored for '{table_name}' in {extract_incremental} mode; reading rows updated after the batch date")
+    elif to_position <= from_position:
+        print(f"No changes possible for '{table_name}' since SCN {from_position}.")
+        return {'rows': 0, 'changed': False, 'files': [], 'high_water_mark': None}
+    else:
+        print(f"Reading '{table_name}' changes ({extract_incremental}) in SCN range ({from_position}, {to_position}]")
+        change_filter = change_capture_filter(table_name, from_position, to_position)
+
+    entry = export_table(table_name, batch_no, batch_date, previous_entry=previous_entry, change_filter=change_filter)
+    save_change_position(table_name, to_position, batch_no)
+    positions[table_name] = to_position
+    print(f"SCN for '{table_name}' advanced to {to_position}")
+    if extract_incremental == 'changelog':
+        purge_change_log(table_name, to_position)
+    return entry
+
+def purge_change_log(table_name, to_position):
+    """Delete the log entries of `table_name` the stored SCN now covers, so the log does not grow without end.
+
+    Best effort: entries left behind are filtered out by SCN on the next run and purged then.
+    """
+    source_mode = table_source_mode(table_name)
+    try:
+        with acquire_session(source_mode) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {source_object(change_log_name(table_name), source_mode)} WHERE ORA_ROWSCN <= :to_position",
+                    {'to_position': to_position}
+                )
+                purged = cursor.rowcount
+            connection.commit()
+        print(f"Purged {purged} consumed change log entries of '{table_name}' up to SCN {to_position}")
+    except Exception as e:
+        print(f"Could not purge the change log of '{table_name}': {e}")
+
+def capture_snapshot(table_names):
+    """Pin this run's reads to the current SCN of each source mode `table_names` use (EXTRACT_SNAPSHOT only)."""
+    snapshot_scns.clear()
+    if not extract_snapshot:
+        return
+    for source_mode in sorted({table_source_mode(table_name) for table_name in table_names}):
+        snapshot_scns[source_mode] = get_current_scn(source_mode)
+        print(f"Reading {source_mode} tables as of SCN {snapshot_scns[source_mode]}")
+
+def export_table_incremental(table_name, batch_no, batch_date, watermarks, previous_entry=None):
+    """Export one table and advance its stored high-water mark or change position, if the mode keeps one."""
+    if extract_incremental in ('scn', 'changelog'):
+        return export_table_changes(table_name, batch_no, batch_date, watermarks, previous_entry)
+    high_water_mark = watermarks.get(table_name) if extract_incremental == 'watermark' else None
+    if high_water_mark is not None:
+        print(f"Reading '{table_name}' rows updated after watermark {high_water_mark}")
+    entry = export_table(table_name, batch_no, batch_date, high_water_mark, previous_entry=previous_entry)
+    new_mark = entry['high_water_mark']
+    if extract_incremental == 'watermark' and new_mark is not None:
+        save_watermark(table_name, new_mark, batch_no)
+        watermarks[table_name] = new_mark
+        print(f"Watermark for '{table_name}' advanced to {new_mark}")
+    return entry
+
+def run_manifest_path(date_path):
+    return f"run_manifests/{date_path}/run_manifest.json"
+
+def read_run_manifest(date_path):
+    """Return the run manifest last written for this batch date, or an empty one."""
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=run_manifest_path(date_path))
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {'tables': {}}
+        raise
+    return json.loads(response['Body'].read())
+
+def write_run_manifest(date_path, batch_no, previous_manifest, entries):
+    """Merge this run's table entries into the batch date's run manifest for the S3 -> stage loaders.
+
+    Tables that were not exported (or failed) keep their previous entry, if any.
+    """
+    manifest = {
+        'etl_batch_no': batch_no,
+        'etl_batch_date': date_path,
+        'tables': dict(previous_manifest['tables']),
+    }
+    for table_name, entry in entries.items():
+        manifest['tables'][table_name] = {name: entry[name] for name in ('rows', 'changed', 'files')}
+    s3_client.put_object(
+        Bucket=bucket_name, Key=run_manifest_path(date_path),
+        Body=json.dumps(manifest, indent=2, default=str).encode('utf-8')
+    )
+    print(f"Run manifest written to S3 at {run_manifest_path(date_path)}")
+
+def run_exports(batch_source, table_names):
+    """Export every requested table for every batch; returns the number of failed table exports."""
+    failures = 0
+    if extract_incremental == 'watermark':
+        watermarks = get_watermarks()
+    elif extract_incremental in ('scn', 'changelog'):
+        watermarks = get_change_positions()
+    else:
+        watermarks = {}
+    capture_snapshot(table_names)
+    for batch_no, batch_date in get_batch_control_info(batch_source):
+        date_path = batch_date.strftime('%Y-%m-%d')
+        previous_manifest = read_run_manifest(date_path)
+        entries = {}
+        with ThreadPoolExecutor(max_workers=extract_table_workers) as executor:
+            futures = {}
+            for table_name in table_names:
+                print(f"Processing table '{table_name}' for batch number {batch_no} on date {batch_date}")
+                future = executor.submit(export_table_incremental, table_name, batch_no, batch_date, watermarks,
+                                         previous_manifest['tables'].get(table_name))
+                futures[future] = table_name
+
+            for future in as_completed(futures):
+                try:
+                    entries[futures[future]] = future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"Error exporting table '{futures[future]}' for batch number {batch_no}: {e}")
+        write_run_manifest(date_path, batch_no, previous_manifest, entries)
+    return failures
+
+def plan_backfill(batch_info, first_batch_no, last_batch_no):
+    """Turn batch control rows into non-overlapping (batch_no, batch_date, window_end) windows.
+
+    Batches outside [first_batch_no, last_batch_no] are dropped, batches sharing a date are
+    collapsed into the highest-numbered one, and each window ends at the next later batch date
+    (the newest batch overall stays open-ended).
+    """
+    all_dates = sorted({batch_date for _, batch_date in batch_info})
+    by_date = {}
+    for batch_no, batch_date in batch_info:
+        if first_batch_no <= batch_no <= last_batch_no:
+            if batch_date not in by_date or batch_no > by_date[batch_date]:
+                by_date[batch_date] = batch_no
+
+    windows = []
+    for batch_date in sorted(by_date):
+        later_dates = [date for date in all_dates if date > batch_date]
+        windows.append((by_date[batch_date], batch_date, later_dates[0] if later_dates else None))
+    return windows
+
+def run_backfill(batch_source, table_names, first_batch_no, last_batch_no):
+    """Export every (table, batch) pair in the range concurrently; returns the number of failed exports.
+
+    Backfill windows are explicit, so watermarks and change capture SCNs are neither read nor advanced.
+    """
+    windows = plan_backfill(get_batch_control_info(batch_source), first_batch_no, last_batch_no)
+    capture_snapshot(table_names)
+    previous_manifests = {batch_date: read_run_manifest(batch_date.strftime('%Y-%m-%d')) for _, batch_date, _ in windows}
+    entries = {batch_date: {} for _, batch_date, _ in windows}
+    total = len(windows) * len(table_names)
+    print(f"Backfilling {len(windows)} batch window(s) x {len(table_names)} table(s) = {total} exports "
+          f"with at most {backfill_max_workers} running at once.")
+
+    failures = 0
+    completed = 0
+    with ThreadPoolExecutor(max_workers=backfill_max_workers) as executor:
+        futures = {}
+        for batch_no, batch_date, window_end in windows:
+            for table_name in table_names:
+                previous_entry = previous_manifests[batch_date]['tables'].get(table_name)
+                future = executor.submit(export_table, table_name, batch_no, batch_date, None, window_end, previous_entry)
+                futures[future] = (table_name, batch_no, batch_date, window_end)
+
+        for future in as_completed(futures):
+            table_name, batch_no, batch_date, window_end = futures[future]
+            completed += 1
+            window = f"({batch_date}, {window_end or 'now'}]"
+            try:
+                entries[batch_date][table_name] = future.result()
+                print(f"[{completed}/{total}] {table_name} batch {batch_no} {window} done")
+            except Exception as e:
+                failures += 1
+                print(f"[{completed}/{total}] {table_name} batch {batch_no} {window} failed: {e}")
+
+    for batch_no, batch_date, _ in windows:
+        write_run_manifest(batch_date.strftime('%Y-%m-%d'), batch_no, previous_manifests[batch_date], entries[batch_date])
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Oracle tables to S3 for each ETL batch.")
+    parser.add_argument('--batch-source', choices=['oracle', 'redshift'], default='redshift',
+                        help="Where to read etl batch numbers and dates from")
+    parser.add_argument('--tables', nargs='+', choices=list(tables), default=list(tables),
+                        help="Tables to export (default: all registered tables)")
+    parser.add_argument('--backfill', nargs=2, type=int, metavar=('FIRST_BATCH_NO', 'LAST_BATCH_NO'),
+                        help="Export every batch in this range concurrently, one bounded date window per batch")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.backfill:
+        failures = run_backfill(args.batch_source, args.tables, *args.backfill)
+    else:
+        failures = run_exports(args.batch_source, args.tables)
+    report_pool_stats()
+    print(f"Export finished in {time.time() - start_time:.2f} seconds with {failures} failed table export(s).")
+    if failures:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
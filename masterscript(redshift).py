@@ -1,7 +1,5 @@
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-import sys
 
 # Set the current directory to the script's location
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,23 +8,15 @@ os.chdir(script_dir)
 # List of setup scripts that must run successfully before export scripts
 setup_scripts = ["etl_batch_update.py", "update-db-link(redshift).py"]
 
-# List of export scripts to run in parallel if setup scripts succeed
-export_scripts = [
-    "oracle_to_s3(redshift)/redshift_offices.py",
-    "oracle_to_s3(redshift)/redshift_customers.py",
-    "oracle_to_s3(redshift)/redshift_employees.py",
-    "oracle_to_s3(redshift)/redshift_payments.py",
-    "oracle_to_s3(redshift)/redshift_products.py",
-    "oracle_to_s3(redshift)/redshift_orders.py",
-    "oracle_to_s3(redshift)/redshift_productlines.py",
-    "oracle_to_s3(redshift)/redshift_orderdetails.py"
-]
+# Single extraction engine that exports every registered table inside one process
+export_script = "extract_engine.py"
+export_args = ["--batch-source", "redshift"]
 
 # Function to run a single script and capture output
-def run_script(script_name):
+def run_script(script_name, args=()):
     try:
         result = subprocess.run(
-            ["python", script_name], capture_output=True, text=True, check=True
+            ["python", script_name, *args], capture_output=True, text=True, check=True
         )
         print(f"{script_name} completed successfully:\n{result.stdout}")
         return True
@@ -34,20 +24,6 @@ def run_script(script_name):
         print(f"Error in {script_name}:\n{e.stderr}")
         return False
 
-# Main function to execute all export scripts in parallel
-def run_all_exports():
-    dir = sys.path[0]
-    with ThreadPoolExecutor() as executor:
-
-        futures = {executor.submit(run_script, f'{dir}\\{script}'): script for script in export_scripts}
-        
-        for future in as_completed(futures):
-            script = futures[future]
-            try:
-                future.result()
-            except Exception as e:
-                print(f"{script} generated an exception: {e}")
-
 if __name__ == "__main__":
     # Run setup scripts sequentially
     print("Running setup scripts...")
@@ -56,6 +32,7 @@ if __name__ == "__main__":
             print("Setup script failed. Halting execution.")
             exit(1)  # Exit the script if any setup script fails
 
-    # If setup scripts succeed, proceed to run export scripts in parallel
-    print("Running export scripts in parallel...")
-    run_all_exports()
+    # If setup scripts succeed, export all tables (in parallel within the engine)
+    print("Running export engine...")
+    if not run_script(export_script, export_args):
+        exit(1)
@@ -1,10 +1,27 @@
 import redshift_connector
+import boto3
+import json
 import os
+import sys
+import time
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+# Shared etl_metadata helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl_metadata import extract_fingerprint, get_stage_load, record_hop_metrics, record_stage_load
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Must match the EXTRACT_FORMAT the exporters ran with: 'csv' (default) or 'parquet'
+extract_format = (os.getenv('EXTRACT_FORMAT') or 'csv').lower()
+# Must match the exporters' EXTRACT_COMPRESSION so COPY decompresses the files
+compression_options = {'none': '', 'gzip': 'GZIP', 'zstd': 'ZSTD'}
+extract_compression = (os.getenv('EXTRACT_COMPRESSION') or 'none').lower()
+# Skip the COPY when this exact extract was already copied and merged into devdw (etl_metadata.stage_load)
+skip_unchanged = (os.getenv('SKIP_UNCHANGED') or '1').lower() in ('1', 'true', 'yes')
+
 def get_env_variables():
     """Retrieve environment variables for AWS and Redshift credentials."""
     aws_credentials = {
@@ -58,19 +75,40 @@ def get_batch_details(connection):
         print(f"Error executing query: {e}")
         return None, None
 
+def get_run_manifest_entry(bucket_name, region, batch_date, table_name):
+    """Return this table's entry from the exporter's run manifest, or None if there is none."""
+    s3_client = boto3.client('s3', region_name=region, endpoint_url=os.getenv('S3_ENDPOINT_URL'))
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=f"run_manifests/{batch_date}/run_manifest.json")
+    except ClientError as e:
+        print(f"No run manifest for {batch_date}; loading without change detection: {e}")
+        return None
+    return json.loads(response['Body'].read())['tables'].get(table_name.upper())
+
 def copy_data_from_s3_to_redshift(cursor, schema_name, table_name, s3_path, iam_arn, region):
-    """Copy data from S3 to Redshift table in devstage schema."""
+    """Copy data from S3 to Redshift table in devstage schema; returns the number of rows loaded."""
+    if extract_format == 'parquet':
+        # Columnar COPY maps columns by position and reads typed values, so no CSV parsing options apply;
+        # the bucket must be in the cluster's region because REGION is not supported for Parquet
+        format_options = "FORMAT AS PARQUET"
+    else:
+        format_options = f"""FORMAT AS CSV
+    DELIMITER ','
+    QUOTE '"'
+    IGNOREHEADER 1
+    REGION AS '{region}'"""
     copy_query = f"""
     COPY h24parva.{schema_name}.{table_name}
     FROM '{s3_path}'
     IAM_ROLE '{iam_arn}'
-    FORMAT AS CSV
-    DELIMITER ','
-    QUOTE '"'
-    IGNOREHEADER 1
-    REGION AS '{region}'
+    MANIFEST
+    {format_options}
+    {compression_options[extract_compression]}
     """
     cursor.execute(copy_query)
+    # Rows loaded by the COPY above, for the hop metrics
+    cursor.execute("SELECT pg_last_copy_count()")
+    return cursor.fetchone()[0]
 
 def main():
     # Load environment variables
@@ -80,19 +118,38 @@ def main():
     # Connect to Redshift and get batch details
     redshift_conn = connect_to_redshift(redshift_credentials, aws_credentials['region'])
     redshift_cursor = redshift_conn.cursor()
-    _, batch_date = get_batch_details(redshift_conn)
+    batch_no, batch_date = get_batch_details(redshift_conn)
     if not batch_date:
         print("No batch date found; exiting script.")
         return
 
-    # S3 path configuration based on batch date
-    s3_file_path = f"s3://{aws_credentials['bucket_name']}/{table_name}/{batch_date}/{table_name.upper()}.csv"
+    # Nothing to load when the exporter found no rows, or when these exact files were already copied
+    # and merged into the DW; an extract whose merge never finished is copied again
+    entry = get_run_manifest_entry(aws_credentials['bucket_name'], aws_credentials['region'], batch_date, table_name)
+    fingerprint = extract_fingerprint(entry) if entry is not None else None
+    loaded_fingerprint, merged = get_stage_load(redshift_cursor, table_name.upper())
+    redshift_conn.commit()
+    if entry is not None and (entry['rows'] == 0 or (skip_unchanged and merged and fingerprint == loaded_fingerprint)):
+        reason = "no rows were extracted" if entry['rows'] == 0 else "its extract was already loaded into devdw"
+        print(f"Skipping COPY into devstage.{table_name}: {reason} for {batch_date}.")
+        redshift_cursor.close()
+        redshift_conn.close()
+        return
+
+    # S3 path configuration based on batch date; the exporter's manifest lists the data files to load
+    s3_file_path = f"s3://{aws_credentials['bucket_name']}/{table_name}/{batch_date}/{table_name.upper()}.manifest"
 
     # Copy data from S3 to Redshift
     try:
-        copy_data_from_s3_to_redshift(redshift_cursor, schema_name, table_name, s3_file_path, redshift_credentials['iam_arn'], aws_credentials['region'])
+        start_time = time.perf_counter()
+        copied_rows = copy_data_from_s3_to_redshift(redshift_cursor, schema_name, table_name, s3_file_path, redshift_credentials['iam_arn'], aws_credentials['region'])
+        if fingerprint is not None:
+            record_stage_load(redshift_cursor, table_name.upper(), batch_no, fingerprint)
         redshift_conn.commit()
+        copy_seconds = time.perf_counter() - start_time
         print(f"Data successfully loaded into Redshift table devstage.{table_name}.")
+        copied_bytes = sum(file['bytes'] for file in entry['files']) if entry else None
+        record_hop_metrics(redshift_conn, batch_no, batch_date, table_name.upper(), [('copy', copied_rows, copied_bytes, copy_seconds)])
     except Exception as e:
         redshift_conn.rollback()
         print(f"Error loading data into Redshift: {e}")
@@ -0,0 +1,109 @@
+"""Source table registry and where each table is read from.
+
+Kept free of connections and clients so helper scripts (update-db-link.py, create_change_log.py)
+can import it without starting the exporter; extract_engine re-exports everything here.
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Table registry: columns to extract, the key used to split a table into ranges, the key the
+# stage table is sorted (and the DW merge joins) on and the columns that identify a row
+tables = {
+    'OFFICES': {
+        'columns': ['OFFICECODE', 'CITY', 'PHONE', 'ADDRESSLINE1', 'ADDRESSLINE2', 'STATE', 'COUNTRY', 'POSTALCODE', 'TERRITORY', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'OFFICECODE',
+        'sort_key': ['OFFICECODE'],
+        'primary_key': ['OFFICECODE'],
+    },
+    'CUSTOMERS': {
+        'columns': ['CUSTOMERNUMBER', 'CUSTOMERNAME', 'CONTACTLASTNAME', 'CONTACTFIRSTNAME', 'PHONE', 'ADDRESSLINE1', 'ADDRESSLINE2', 'CITY', 'STATE', 'POSTALCODE', 'COUNTRY', 'SALESREPEMPLOYEENUMBER', 'CREDITLIMIT', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'CUSTOMERNUMBER',
+        'sort_key': ['CUSTOMERNUMBER'],
+        'primary_key': ['CUSTOMERNUMBER'],
+    },
+    'EMPLOYEES': {
+        'columns': ['EMPLOYEENUMBER', 'LASTNAME', 'FIRSTNAME', 'EXTENSION', 'EMAIL', 'OFFICECODE', 'REPORTSTO', 'JOBTITLE', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'EMPLOYEENUMBER',
+        'sort_key': ['EMPLOYEENUMBER'],
+        'primary_key': ['EMPLOYEENUMBER'],
+    },
+    'PAYMENTS': {
+        'columns': ['CUSTOMERNUMBER', 'CHECKNUMBER', 'PAYMENTDATE', 'AMOUNT', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'CUSTOMERNUMBER',
+        'sort_key': ['CUSTOMERNUMBER', 'CHECKNUMBER'],
+        'primary_key': ['CUSTOMERNUMBER', 'CHECKNUMBER'],
+    },
+    'PRODUCTS': {
+        'columns': ['PRODUCTCODE', 'PRODUCTNAME', 'PRODUCTLINE', 'PRODUCTSCALE', 'PRODUCTVENDOR', 'QUANTITYINSTOCK', 'BUYPRICE', 'MSRP', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'PRODUCTCODE',
+        'sort_key': ['PRODUCTCODE'],
+        'primary_key': ['PRODUCTCODE'],
+    },
+    'ORDERS': {
+        'columns': ['ORDERNUMBER', 'ORDERDATE', 'REQUIREDDATE', 'SHIPPEDDATE', 'STATUS', 'CUSTOMERNUMBER', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP', 'cancelledDate'],
+        'partition_key': 'ORDERNUMBER',
+        'sort_key': ['ORDERNUMBER'],
+        'primary_key': ['ORDERNUMBER'],
+    },
+    'PRODUCTLINES': {
+        'columns': ['PRODUCTLINE', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'PRODUCTLINE',
+        'sort_key': ['PRODUCTLINE'],
+        'primary_key': ['PRODUCTLINE'],
+    },
+    'ORDERDETAILS': {
+        'columns': ['ORDERNUMBER', 'PRODUCTCODE', 'QUANTITYORDERED', 'PRICEEACH', 'ORDERLINENUMBER', 'CREATE_TIMESTAMP', 'UPDATE_TIMESTAMP'],
+        'partition_key': 'ORDERNUMBER',
+        'sort_key': ['ORDERNUMBER', 'PRODUCTCODE'],
+        'primary_key': ['ORDERNUMBER', 'PRODUCTCODE'],
+    },
+}
+
+# Where each table is read from: 'link' (default) queries {TABLE}@parva_dblink on an ORACLE_USERNAME
+# session, 'direct' logs in to the source schema itself (DBLINK_USERNAME on SOURCE_DSN) from a second
+# pool and skips the link hop. EXTRACT_SOURCE_MODE sets the default for every table and
+# EXTRACT_SOURCE_MODE_TABLES overrides it per table, e.g. "ORDERS=direct,ORDERDETAILS=direct".
+db_link_name = 'parva_dblink'
+source_modes = ('link', 'direct')
+source_username = os.getenv('DBLINK_USERNAME')
+source_password = os.getenv('DBLINK_PASSWORD')
+source_dsn = os.getenv('SOURCE_DSN') or os.getenv('ORACLE_DSN')
+extract_source_mode = (os.getenv('EXTRACT_SOURCE_MODE') or 'link').lower()
+if extract_source_mode not in source_modes:
+    raise ValueError(f"Unsupported EXTRACT_SOURCE_MODE '{extract_source_mode}'; expected 'link' or 'direct'.")
+
+def parse_table_source_modes(setting):
+    """Turn "TABLE=mode,..." into a {table: mode} dict, rejecting unknown tables and modes."""
+    modes = {}
+    for entry in filter(None, (part.strip() for part in (setting or '').split(','))):
+        table_name, _, mode = entry.partition('=')
+        table_name, mode = table_name.strip().upper(), mode.strip().lower()
+        if table_name not in tables or mode not in source_modes:
+            raise ValueError(f"Invalid EXTRACT_SOURCE_MODE_TABLES entry '{entry}'; expected TABLE=link or TABLE=direct.")
+        modes[table_name] = mode
+    return modes
+
+table_source_modes = parse_table_source_modes(os.getenv('EXTRACT_SOURCE_MODE_TABLES'))
+
+def table_source_mode(table_name):
+    """Return 'link' or 'direct' for `table_name`."""
+    return table_source_modes.get(table_name, extract_source_mode)
+
+def source_object(name, source_mode):
+    """Name a source-schema object (table, log or package function) as seen from a `source_mode` session."""
+    return f"{name}@{db_link_name}" if source_mode == 'link' else name
+
+def uses_db_link(table_names=None):
+    """True if any of `table_names` (default: every registered table) is read through the link."""
+    return any(table_source_mode(table_name) == 'link' for table_name in table_names or tables)
+
+# EXTRACT_INCREMENTAL=changelog reads changed keys from one log per table, {CHANGE_LOG_TABLE}_{TABLE},
+# which create_change_log.py creates in the source schema with the table's primary key columns and types
+change_log_table = os.getenv('CHANGE_LOG_TABLE') or 'ETL_CHANGE_LOG'
+
+def change_log_name(table_name):
+    """Name of the log holding `table_name`'s changed keys."""
+    return f"{change_log_table}_{table_name}"
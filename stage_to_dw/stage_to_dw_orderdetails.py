@@ -1,8 +1,13 @@
 import redshift_connector
 import os
+import sys
 from dotenv import load_dotenv
 import json
 
+# Shared etl_metadata helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl_metadata import execute_timed, mark_stage_merged, record_hop_metrics
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -53,7 +58,7 @@ def get_batch_details(connection):
         print(f"Error executing query: {e}")
         return None, None
 
-def stg_to_dw(cursor, batch_no, batch_date):
+def stg_to_dw(cursor, batch_no, batch_date, metrics):
     """Transfers data from devstage to devdw"""
     update_query = f"""
        UPDATE devdw.OrderDetails B
@@ -110,8 +115,8 @@ def stg_to_dw(cursor, batch_no, batch_date):
         JOIN devdw.Orders O ON A.orderNumber = O.src_orderNumber
         WHERE B.src_orderNumber IS NULL;
         """
-    cursor.execute(update_query)
-    cursor.execute(insert_query)
+    execute_timed(cursor, metrics, 'dw_update', update_query)
+    execute_timed(cursor, metrics, 'dw_insert', insert_query)
 
 def main():
     # Load environment variables
@@ -125,9 +130,13 @@ def main():
         return
     # Copy data from stage to dw
     try:
-        stg_to_dw(redshift_cursor, batch_no, batch_date)        
+        metrics = []
+        stg_to_dw(redshift_cursor, batch_no, batch_date, metrics)
+        # Lets the next loader run skip copying this extract again
+        mark_stage_merged(redshift_cursor, 'ORDERDETAILS')
         redshift_conn.commit()
         print(f"Data successfully loaded into Redshift table devdw.orderdetails.")
+        record_hop_metrics(redshift_conn, batch_no, batch_date, 'ORDERDETAILS', metrics)
     except Exception as e:
         redshift_conn.rollback()
         print(f"Error loading data into devdw: {e}")
@@ -1,8 +1,13 @@
 import redshift_connector
 import os
+import sys
 from dotenv import load_dotenv
 import json
 
+# Shared etl_metadata helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl_metadata import execute_timed, mark_stage_merged, record_hop_metrics
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -53,7 +58,7 @@ def get_batch_details(connection):
         print(f"Error executing query: {e}")
         return None, None
 
-def stg_to_dw(cursor, batch_no, batch_date):
+def stg_to_dw(cursor, batch_no, batch_date, metrics):
     """Transfers data from devstage to devdw"""
     update_query = f"""
         INSERT INTO devdw.Payments
@@ -81,7 +86,8 @@ def stg_to_dw(cursor, batch_no, batch_date):
         FROM devstage.Payments A
         JOIN devdw.Customers C ON A.customerNumber = C.src_customerNumber;
         """
-    cursor.execute(update_query)
+    execute_timed(cursor, metrics, 'dw_insert', update_query)
+
 def main():
     # Load environment variables
     redshift_credentials = get_env_variables()
@@ -94,9 +100,13 @@ def main():
         return
     # Copy data from stage to dw
     try:
-        stg_to_dw(redshift_cursor, batch_no, batch_date)        
+        metrics = []
+        stg_to_dw(redshift_cursor, batch_no, batch_date, metrics)
+        # Lets the next loader run skip copying this extract again
+        mark_stage_merged(redshift_cursor, 'PAYMENTS')
         redshift_conn.commit()
         print(f"Data successfully loaded into Redshift table devdw.payments.")
+        record_hop_metrics(redshift_conn, batch_no, batch_date, 'PAYMENTS', metrics)
     except Exception as e:
         redshift_conn.rollback()
         print(f"Error loading data into devdw: {e}")
@@ -1,96 +1,222 @@
-import oracledb
-import csv
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
 import os
-import boto3 
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from io import StringIO
 
+from extract_engine import (
+    S3MultipartWriter, acquire_session, bucket_name, compressed_stream, compression_suffixes, create_bucket_if_not_exists,
+    csv_output_handler, decimal_output_handler, extract_compression, extract_fast_convert, extract_format, extract_snapshot,
+    fetch_batches, get_current_scn, lob_output_handler, lob_select_list, merge_lob_columns, region, report_pool_stats,
+    table_fetch_sizes, write_csv, write_csv_lobs, write_parquet
+)
+from source_config import tables as source_tables
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Get Oracle credentials from environment variables
-username = os.getenv('ORACLE_USERNAME')
-password = os.getenv('ORACLE_PASSWORD')
-dsn = os.getenv('ORACLE_DSN')
-d = os.getenv('d')
-
-# Get AWS credentials and S3 bucket details
-aws_access_key = os.getenv('AWS_ACCESS_KEY_ID')
-aws_secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
-aws_region = os.getenv('AWS_REGION')
-s3_bucket_name = os.getenv('S3_BUCKET_NAME')
-
-# Initialize Oracle Instant Client (for thick mode)
-try:
-    #d = r"C:\Users\parva.joshi\Downloads\oracle-client\instantclient_23_5"
-    oracledb.init_oracle_client(lib_dir=d)
-    #oracledb.init_oracle_client(lib_dir=oracle_client_path)  
-    # Path from environment variable
-except oracledb.DatabaseError as e:
-    print(f"Error initializing Oracle Client: {e}")
-    exit(1)
-
 schema_name = 'CM_20050609'
-#col_names = 'productline, textdescription'
-tables=['offices','products','productlines','orders','orderdetails','payments','employees','customers']
-
-# Connect to Oracle Database using python-oracledb in thick mode
-try:
-    connection = oracledb.connect(user=username, password=password, dsn=dsn)
-    print("Successfully connected to Oracle Database")
-
-    # Create a cursor
-    cursor = connection.cursor()
-
-    for table in tables:
-        # Query the required table from the required schema
-        query = f"SELECT * FROM {schema_name}.{table}"
-        cursor.execute(query)
-
-        # Fetch column names
-        column_names = [desc[0] for desc in cursor.description]
-
-        # Fetch all data from the query
-        rows = cursor.fetchall()
-
-        # CSV file path
-        csv_file = f'{schema_name}/{table}/{table}.csv'
-        
-        # Use StringIO to hold CSV data in memory
-        csv_buffer = StringIO()
-        writer = csv.writer(csv_buffer)
-
-        # Write the column headers
-        writer.writerow(column_names)
-
-        # Write the rows
-        writer.writerows(rows)
-        
-        # Upload the CSV file to S3 
-        try:
-            s3_client = boto3.client('s3',
-                                    aws_access_key_id=aws_access_key,
-                                    aws_secret_access_key=aws_secret_key,
-                                    region_name=aws_region)
-            
-        except:
-            print(f"Error: Cannot connect to AWS S3")
-            
-        # Upload the file to S3
-        s3_client.put_object(
-            Bucket=s3_bucket_name,
-            Key=csv_file,
-            Body=csv_buffer.getvalue()
-        )
-
-        print(f"'{schema_name}.{table}' table has been successfully uploaded to S3 as {csv_file}")
-
-except oracledb.DatabaseError as e:
-    print(f"Error: {e}")
-finally:
-    if cursor:
-        cursor.close()
-    if connection:
-        connection.close()
-        print("Database connection closed.")
\ No newline at end of file
+tables = ['offices', 'products', 'productlines', 'orders', 'orderdetails', 'payments', 'employees', 'customers']
+
+# Number of tables read at the same time, each on its own pooled session
+snapshot_workers = int(os.getenv('SNAPSHOT_WORKERS') or str(len(tables)))
+
+# Primary key columns of each table from the source registry, used to match rows between snapshots in --diff mode
+primary_keys = {table_name.lower(): table['primary_key'] for table_name, table in source_tables.items()}
+
+# --diff keeps the primary key -> row hash index of each table's last uploaded snapshot here
+snapshot_index_dir = os.getenv('SNAPSHOT_INDEX_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot_index')
+
+
+class RowHashIndex:
+    """Primary key -> row hash index of one table's last uploaded snapshot, kept in a local sqlite file.
+
+    diff() compares a new snapshot with it while the rows stream past and yields only inserted,
+    updated and deleted rows, each prefixed with its operation ('I', 'U' or 'D'; deletes carry just
+    the key). The new index is built beside the old one and replaces it on commit(), once the delta
+    is safely in S3, so a failed run diffs against the same snapshot next time.
+    """
+
+    def __init__(self, path, key_positions, column_count):
+        self.path = path
+        self.key_positions = key_positions
+        self.column_count = column_count
+        self.counts = {'I': 0, 'U': 0, 'D': 0}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path + '.new'):
+            os.remove(path + '.new')
+        self.db = sqlite3.connect(path + '.new')
+        # 8-byte hashes keyed by the JSON-encoded key keep the index a small fraction of the table
+        self.db.execute("CREATE TABLE row_hash (pk TEXT PRIMARY KEY, hash BLOB NOT NULL) WITHOUT ROWID")
+        self.db.execute("CREATE TEMP TABLE batch (position INTEGER, pk TEXT, hash BLOB)")
+        self.has_previous = os.path.exists(path)
+        if self.has_previous:
+            self.db.execute("ATTACH DATABASE ? AS previous", (path,))
+
+    def entry(self, row):
+        key = json.dumps([row[position] for position in self.key_positions], default=str)
+        values = '\x1f'.join('' if value is None else str(value) for value in row)
+        return key, hashlib.blake2b(values.encode('utf-8'), digest_size=8).digest()
+
+    def diff(self, batches):
+        """Yield one list of changed rows per fetched batch, then the deleted rows."""
+        for rows in batches:
+            entries = [(position, *self.entry(row)) for position, row in enumerate(rows)]
+            self.db.executemany("INSERT INTO row_hash VALUES (?, ?)", [(key, digest) for _, key, digest in entries])
+            if not self.has_previous:
+                changed = [('I', *row) for row in rows]
+            else:
+                self.db.executemany("INSERT INTO batch VALUES (?, ?, ?)", entries)
+                changed = [('I' if is_new else 'U', *rows[position]) for position, is_new in self.db.execute("""
+                    SELECT b.position, p.hash IS NULL
+                    FROM batch b LEFT JOIN previous.row_hash p ON p.pk = b.pk
+                    WHERE p.hash IS NULL OR p.hash != b.hash
+                    ORDER BY b.position
+                """)]
+                self.db.execute("DELETE FROM batch")
+            for row in changed:
+                self.counts[row[0]] += 1
+            yield changed
+        if self.has_previous:
+            yield from self.deleted()
+
+    def deleted(self):
+        cursor = self.db.execute("""
+            SELECT pk FROM previous.row_hash p
+            WHERE NOT EXISTS (SELECT 1 FROM row_hash r WHERE r.pk = p.pk)
+        """)
+        while keys := cursor.fetchmany(10000):
+            rows = []
+            for (key,) in keys:
+                values = [None] * self.column_count
+                for position, value in zip(self.key_positions, json.loads(key)):
+                    values[position] = value
+                rows.append(('D', *values))
+            self.counts['D'] += len(rows)
+            yield rows
+
+    def commit(self):
+        self.db.commit()
+        self.db.close()
+        os.replace(self.path + '.new', self.path)
+
+    def discard(self):
+        self.db.close()
+        os.remove(self.path + '.new')
+
+
+def snapshot_table(schema, table, scn=None, delta_tag=None):
+    """Stream a full copy of `schema.table` (as of `scn`, if given) into S3 under `schema/table/`; returns (key, rows, bytes).
+
+    With a `delta_tag` only the rows that changed since the last snapshot are written, to
+    `schema/table/delta/table_<delta_tag>`; the key is None when nothing changed.
+    """
+    file_suffix = f"{extract_format}{compression_suffixes[extract_compression]}"
+    s3_path = f"{schema}/{table}/{table}.{file_suffix}"
+    index = None
+    with acquire_session() as connection:
+        with connection.cursor() as cursor:
+            # Describe the table first so LOB columns (PRODUCTLINES) can be read inline instead of
+            # through one locator round trip per row
+            cursor.execute(f"SELECT * FROM {schema}.{table} WHERE 1 = 0")
+            select_list, lob_positions = lob_select_list(cursor.description)
+
+            # Fetch in batches so memory stays flat however large the table is
+            cursor.arraysize, cursor.prefetchrows = table_fetch_sizes(table.upper())
+            if extract_format == 'parquet':
+                cursor.outputtypehandler = decimal_output_handler
+            elif extract_fast_convert:
+                cursor.outputtypehandler = csv_output_handler
+            if lob_positions:
+                cursor.outputtypehandler = lob_output_handler(cursor.outputtypehandler)
+            as_of = f" AS OF SCN {scn}" if scn is not None else ""
+            cursor.execute(f"SELECT {select_list or '*'} FROM {schema}.{table}{as_of}")
+            description = cursor.description[:len(cursor.description) - len(lob_positions)]
+            column_names = [desc[0] for desc in description]
+            batches = fetch_batches(cursor, cursor.fetchmany())
+            if lob_positions:
+                # Diffs hash every value, so long LOBs are read in full rather than streamed
+                resolve_locators = extract_format == 'parquet' or delta_tag is not None
+                batches = merge_lob_columns(batches, lob_positions, resolve_locators, hex_blobs=extract_format == 'csv')
+
+            if delta_tag is not None:
+                key_positions = [column_names.index(column) for column in primary_keys[table.lower()]]
+                index = RowHashIndex(os.path.join(snapshot_index_dir, schema, f"{table}.sqlite"), key_positions, len(column_names))
+                s3_path = f"{schema}/{table}/delta/{table}_{delta_tag}.{file_suffix}"
+                column_names = ['OP'] + column_names
+                batches = (rows for rows in index.diff(batches) if rows)
+                first_rows = next(batches, None)
+                if first_rows is None:
+                    index.commit()
+                    print(f"'{schema}.{table}' is unchanged since the last snapshot; no delta written")
+                    return None, 0, 0
+                batches = itertools.chain([first_rows], batches)
+
+            # Parts upload while the next batches are fetched
+            try:
+                with S3MultipartWriter(s3_path) as upload:
+                    if extract_format == 'parquet':
+                        row_count = write_parquet(description, batches, upload)
+                    else:
+                        output = compressed_stream(upload)
+                        if lob_positions and index is None:
+                            row_count = write_csv_lobs(column_names, batches, output, lob_positions)
+                        else:
+                            row_count = write_csv(column_names, batches, output)
+                        if output is not upload:
+                            output.close()
+            except Exception:
+                if index is not None:
+                    index.discard()
+                raise
+    if index is not None:
+        index.commit()
+        print(f"'{schema}.{table}' delta: {index.counts['I']} inserted, {index.counts['U']} updated, {index.counts['D']} deleted")
+    return s3_path, row_count, upload.bytes_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a full snapshot of every table in a source schema to S3.")
+    parser.add_argument('--schema', default=schema_name, help=f"Source schema to snapshot (default: {schema_name})")
+    parser.add_argument('--tables', nargs='+', default=tables, help="Tables to snapshot (default: all eight)")
+    parser.add_argument('--diff', action='store_true',
+                        help="Upload only rows inserted, updated or deleted since the last --diff snapshot, with an OP column")
+    args = parser.parse_args()
+    if args.diff and extract_format != 'csv':
+        parser.error("--diff writes CSV deltas; unset EXTRACT_FORMAT=parquet")
+    if args.diff and {table.lower() for table in args.tables} - set(primary_keys):
+        parser.error(f"--diff needs the primary key of every table; tables in source_config: {', '.join(primary_keys)}")
+
+    create_bucket_if_not_exists(bucket_name, region)
+    start_time = time.perf_counter()
+    # EXTRACT_SNAPSHOT: every table is read as of the same SCN, so the copies agree with each other
+    scn = get_current_scn() if extract_snapshot else None
+    if scn is not None:
+        print(f"Snapshotting {args.schema} as of SCN {scn}")
+    delta_tag = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ') if args.diff else None
+    failures = 0
+    with ThreadPoolExecutor(max_workers=snapshot_workers) as executor:
+        futures = {executor.submit(snapshot_table, args.schema, table, scn, delta_tag): table for table in args.tables}
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                s3_path, row_count, size = future.result()
+                if s3_path is None:
+                    continue
+                print(f"'{args.schema}.{table}' table has been successfully uploaded to S3 as {s3_path} ({row_count} rows, {size} bytes)")
+            except Exception as e:
+                failures += 1
+                print(f"Error exporting '{args.schema}.{table}': {e}")
+
+    report_pool_stats()
+    print(f"Snapshot of {args.schema} finished in {time.perf_counter() - start_time:.2f} seconds with {failures} failed table(s).")
+    if failures:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import csv
+import datetime
+import io
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The engine lives in the repository root and needs its runtime dependencies to import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for module in ('oracledb', 'boto3', 'botocore', 'dotenv'):
+    pytest.importorskip(module)
+
+import extract_engine
+from benchmarks.classicmodels_generator import ClassicModelsGenerator, write_sqlite
+from benchmarks.local_pipeline_benchmark import LocalS3, SourcePool, Warehouse, commit_source, enable_change_capture
+
+BUCKET = 'change-capture-test'
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, request):
+    """The sqlite source with change capture, the S3 stand-in and the warehouse, wired into the engine."""
+    source_path = str(tmp_path / 'source.db')
+    generator = ClassicModelsGenerator(1, 42)
+    write_sqlite(source_path, generator.snapshot())
+    enable_change_capture(source_path)
+    s3 = LocalS3()
+    s3.create_bucket(Bucket=BUCKET)
+    warehouse = Warehouse(str(tmp_path), s3)
+    monkeypatch.setattr(extract_engine, 'extract_incremental', request.param)
+    monkeypatch.setattr(extract_engine, 's3_client', s3)
+    monkeypatch.setattr(extract_engine, 'bucket_name', BUCKET)
+    monkeypatch.setattr(extract_engine, 'session_pool', SourcePool(source_path, extract_engine.init_session))
+    monkeypatch.setattr(extract_engine, 'direct_session_pool', SourcePool(source_path, extract_engine.init_session))
+    monkeypatch.setattr(extract_engine, 'connect_to_redshift', warehouse.connect)
+    return source_path, generator, s3, warehouse
+
+def exported_order_numbers(s3, batch_date):
+    """ORDERNUMBERs in the ORDERS extract files of `batch_date`."""
+    prefix = f"orders/{batch_date}/"
+    numbers = []
+    for key, data in s3.buckets[BUCKET].items():
+        if key.startswith(prefix) and key.endswith('.csv'):
+            numbers += [int(row['ORDERNUMBER']) for row in csv.DictReader(io.StringIO(data.decode('utf-8')))]
+    return sorted(numbers)
+
+def run_batch(warehouse, batch_no, batch_date):
+    warehouse.set_batch(batch_no, batch_date)
+    assert extract_engine.run_exports('redshift', ['ORDERS']) == 0
+
+
+@pytest.mark.parametrize('pipeline', ['scn', 'changelog'], indirect=True)
+def test_row_updated_between_batches_is_only_in_the_second_delta(pipeline):
+    source_path, generator, s3, warehouse = pipeline
+    first_date = generator.history_start
+    run_batch(warehouse, 1, first_date)
+    assert len(exported_order_numbers(s3, first_date)) == 326
+
+    # A status change committed between batches 1 and 2, with no UPDATE_TIMESTAMP change the
+    # batch date filter could see
+    connection = sqlite3.connect(source_path)
+    order_number = connection.execute("SELECT MIN(ORDERNUMBER) FROM ORDERS").fetchone()[0]
+    connection.execute("UPDATE ORDERS SET STATUS = 'Disputed' WHERE ORDERNUMBER = ?", (order_number,))
+    connection.commit()
+    connection.close()
+    commit_source(source_path)
+
+    second_date = datetime.date(2005, 6, 10)
+    run_batch(warehouse, 2, second_date)
+    assert exported_order_numbers(s3, second_date) == [order_number]
+
+    third_date = datetime.date(2005, 6, 11)
+    run_batch(warehouse, 3, third_date)
+    assert exported_order_numbers(s3, third_date) == []
+
+    if extract_engine.extract_incremental == 'changelog':
+        connection = sqlite3.connect(source_path)
+        assert connection.execute(f"SELECT COUNT(*) FROM {extract_engine.change_log_name('ORDERS')}").fetchone()[0] == 0
+        connection.close()
@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+# The engine lives in the repository root and needs its runtime dependencies to import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for module in ('oracledb', 'boto3', 'botocore', 'dotenv'):
+    pytest.importorskip(module)
+
+import extract_engine
+from benchmarks.local_pipeline_benchmark import LocalS3
+from extract_engine import CheckpointedS3Writer, checkpoint_path, read_checkpoint
+
+BUCKET = 'checkpoint-test'
+KEY = 'orders/2005-06-09/ORDERS.csv'
+
+
+class FirstPartLastS3(LocalS3):
+    """LocalS3 whose upload of part 1 waits until `release` is set, so later parts finish first."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == 1:
+            assert self.release.wait(timeout=10)
+        return super().upload_part(Bucket, Key, UploadId, PartNumber, Body)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    s3 = FirstPartLastS3()
+    s3.create_bucket(Bucket=BUCKET)
+    monkeypatch.setattr(extract_engine, 's3_client', s3)
+    monkeypatch.setattr(extract_engine, 'bucket_name', BUCKET)
+    return s3
+
+
+def test_parts_finishing_out_of_order_checkpoint_and_resume(s3):
+    upload = CheckpointedS3Writer(KEY, 'signature', part_size=1, max_inflight=4)
+    for number in (1, 2, 3):
+        upload.write(f"row {number}\n".encode())
+        upload.end_chunk(number, number, None)
+
+    # Parts 2 and 3 land while part 1 is still in flight: no gap-free run yet, so no checkpoint
+    for future in upload._futures[1:]:
+        future.result()
+    assert checkpoint_path(KEY) not in s3.buckets[BUCKET]
+
+    s3.release.set()
+    upload._futures[0].result()
+    checkpoint = json.loads(s3.buckets[BUCKET][checkpoint_path(KEY)])
+    assert [part['PartNumber'] for part in checkpoint['parts']] == [1, 2, 3]
+    assert (checkpoint['last_key'], checkpoint['rows']) == (3, 3)
+
+    # The extract fails after part 3; the next run appends to the same upload
+    upload.abort()
+    resumed = CheckpointedS3Writer(KEY, 'signature', checkpoint=read_checkpoint(KEY, 'signature'), part_size=1)
+    resumed.write(b"row 4\n")
+    resumed.close()
+
+    assert s3.buckets[BUCKET][KEY] == b"row 1\nrow 2\nrow 3\nrow 4\n"
+    assert checkpoint_path(KEY) not in s3.buckets[BUCKET]
+    assert not s3.uploads
@@ -0,0 +1,30 @@
+import collections
+import os
+import sys
+
+import pytest
+
+# The engine lives in the repository root and needs its runtime dependencies to import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for module in ('oracledb', 'boto3', 'botocore', 'dotenv'):
+    pytest.importorskip(module)
+
+import oracledb
+
+import extract_engine
+from extract_engine import external_sort, row_sort_key
+
+Column = collections.namedtuple('Column', 'name type_code')
+
+
+def test_nulls_sort_last_like_oracle(monkeypatch):
+    monkeypatch.setattr(extract_engine, 'extract_fast_convert', True)
+    # Runs of two rows, so the NULLs also go through the spill files and the merge
+    monkeypatch.setattr(extract_engine, 'extract_sort_run_rows', 2)
+    description = [Column('CUSTOMERNUMBER', oracledb.DB_TYPE_NUMBER), Column('CHECKNUMBER', oracledb.DB_TYPE_VARCHAR)]
+    rows = [('103', 'B'), (None, 'A'), ('20', None), ('103', None), ('20', 'C'), (None, None)]
+
+    key = row_sort_key(description, [0, 1])
+    merged = [row for batch in external_sort([rows[:2], rows[2:4], rows[4:]], key, batch_rows=2) for row in batch]
+
+    assert merged == [('20', 'C'), ('20', None), ('103', 'B'), ('103', None), (None, 'A'), (None, None)]
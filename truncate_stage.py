@@ -1,6 +1,7 @@
 import redshift_connector
 import os
 from dotenv import load_dotenv
+from etl_metadata import clear_stage_loads
 
 # Load environment variables from .env file
 load_dotenv()
@@ -47,6 +48,8 @@ def truncate_stage_tables(cursor):
     for table in tables:
         query = f"TRUNCATE TABLE devstage.{table};"
         cursor.execute(query)
+    # The recorded extracts are no longer in the stage, so a merge before the next COPY marks none of them merged
+    clear_stage_loads(cursor)
 
 def main():
     # Load environment variables
@@ -2,6 +2,8 @@ import os
 import oracledb
 from dotenv import load_dotenv
 
+from source_config import db_link_name, uses_db_link
+
 # Load environment variables
 load_dotenv()
 
@@ -13,7 +15,6 @@ oracledb.init_oracle_client(lib_dir=os.getenv('d'))
 # Variables for database link creation
 db_link_username = os.getenv('DBLINK_USERNAME')  # e.g., cm_20010109
 db_link_password = os.getenv('DBLINK_PASSWORD')  # e.g., cm_20010109123
-db_link_name = "parva_dblink"  # Adjust if link name varies
 
 
 def manage_db_link():
@@ -51,5 +52,8 @@ def manage_db_link():
         if 'connection' in locals():
             connection.close()
 
-# Run the function to manage the database link
-manage_db_link()
+# Recreate the link only while some table is still extracted through it (EXTRACT_SOURCE_MODE)
+if uses_db_link():
+    manage_db_link()
+else:
+    print(f"Every table is extracted in direct mode; database link '{db_link_name}' left as is.")